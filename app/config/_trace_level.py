@@ -0,0 +1,17 @@
+"""Register a TRACE log level below DEBUG and a matching Logger.trace() method.
+
+Done once at import; later imports are just a sys.modules lookup.
+"""
+import logging
+
+TRACE = 5  # Same value Uvicorn uses for its trace level
+
+logging.addLevelName(TRACE, "TRACE")
+
+
+def trace(self, message, *args, **kws):
+    if self.isEnabledFor(TRACE):
+        self._log(TRACE, message, args, **kws)
+
+
+logging.Logger.trace = trace
@@ -1,29 +1,57 @@
+import functools
 import os
-from dotenv import load_dotenv
+import time
+from dotenv import dotenv_values, load_dotenv
 import logging
 from pathlib import Path
+from app.config._trace_level import TRACE
 
-# Configure logging BEFORE any logger usage or .env loading
-log_level_setting = os.getenv('LOG_LEVEL', 'INFO').upper()
-actual_log_level = logging.INFO  # Default if parsing fails or level is unknown
-
-if hasattr(logging, log_level_setting):
-    actual_log_level = getattr(logging, log_level_setting)
-elif log_level_setting == "TRACE":
-    actual_log_level = 5  # TRACE level (often set to 5, as Uvicorn does)
-    logging.addLevelName(actual_log_level, "TRACE")
-    # Add a trace method to Logger instances if it doesn't exist
-    if not hasattr(logging.Logger, 'trace'):
-        def trace(self, message, *args, **kws):
-            if self.isEnabledFor(actual_log_level):
-                self._log(actual_log_level, message, args, **kws)
-        logging.Logger.trace = trace
-else:
-    logging.warning(f"Unknown LOG_LEVEL '{log_level_setting}'. Defaulting to INFO.")
-    actual_log_level = logging.INFO
+_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class _CachedTimeFormatter(logging.Formatter):
+    """Formatter that renders the asctime date/time part once per second
+    instead of calling time.strftime for every record. Output is unchanged."""
+
+    _cache = (None, "")  # (epoch second, formatted "%Y-%m-%d %H:%M:%S")
+
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, prefix = self._cache
+        if second != cached_second:
+            prefix = time.strftime(self.default_time_format, self.converter(record.created))
+            self._cache = (second, prefix)
+        return self.default_msec_format % (prefix, record.msecs)
+
+def _configure_logging():
+    """Configure root logging from LOG_LEVEL exactly once per process."""
+    if getattr(_configure_logging, "_done", False):
+        return
+
+    log_level_setting = os.getenv('LOG_LEVEL', 'INFO').upper()
 
-logging.basicConfig(level=actual_log_level,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if hasattr(logging, log_level_setting):
+        actual_log_level = getattr(logging, log_level_setting)
+    elif log_level_setting == "TRACE":
+        actual_log_level = TRACE
+    else:
+        actual_log_level = None  # Unknown; warn once logging is configured
+
+    # Reconfiguring the root logger clears every logger's level cache, so only
+    # do it when nothing (uvicorn, a test harness, ...) has set it up already.
+    if not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(_CachedTimeFormatter(_LOG_FORMAT))
+        logging.basicConfig(level=actual_log_level or logging.INFO, handlers=[handler])
+    _configure_logging._done = True
+
+    if actual_log_level is None:
+        logging.getLogger(__name__).warning(
+            "Unknown LOG_LEVEL '%s'. Defaulting to INFO.", log_level_setting)
+
+# Configure logging BEFORE any logger usage or .env loading
+_configure_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -33,35 +61,57 @@ def is_running_in_kubernetes():
 
 # Check if we're running in Kubernetes
 IS_K8S = is_running_in_kubernetes()
-logger.info(f"IS_K8S = {IS_K8S}")
+logger.info("IS_K8S = %s", IS_K8S)
+
+_ENV_FILE = Path(__file__).parent.parent.parent / '.env'
+# Variables that came from the .env file (not the real environment); only
+# these may be overwritten when the file is re-read
+_dotenv_keys = set()
 
 if IS_K8S:
     logger.info("Running in Kubernetes, using environment variables")
 else:
     try:
         # Only load .env file if we're not in Kubernetes
-        env_file = Path(__file__).parent.parent.parent / '.env'
-        logger.info(f"Looking for .env file at: {env_file}")
-        if env_file.exists():
-            logger.info(f"Running locally, loading environment from: {env_file}")
-            load_dotenv(env_file)
+        logger.info("Looking for .env file at: %s", _ENV_FILE)
+        if _ENV_FILE.exists():
+            logger.info("Running locally, loading environment from: %s", _ENV_FILE)
+            keys_before = set(os.environ)
+            load_dotenv(_ENV_FILE)
+            _dotenv_keys.update(set(os.environ) - keys_before)
         else:
-            logger.warning(f"Environment file not found: {env_file}")
+            logger.warning("Environment file not found: %s", _ENV_FILE)
+    except Exception as e:
+        logger.warning("Failed to load .env file: %s", e)
+
+def _reload_dotenv():
+    """Re-read the .env file, updating the variables it set (never the real environment)."""
+    if IS_K8S or not _ENV_FILE.exists():
+        return
+    try:
+        for key, value in dotenv_values(_ENV_FILE).items():
+            if value is not None and (key in _dotenv_keys or key not in os.environ):
+                os.environ[key] = value
+                _dotenv_keys.add(key)
     except Exception as e:
-        logger.warning(f"Failed to load .env file: {str(e)}")
+        logger.warning("Failed to reload .env file: %s", e)
+
+# Environment variable names containing any of these are masked in logs
+_SECRET_MARKERS = ("KEY", "SECRET", "TOKEN", "PASSWORD")
 
 class Settings:
     def __init__(self):
         logger.info("Initializing settings constructor...")
-        # Load ALL environment variables dynamically
-        self.env_vars = dict(os.environ)
+        # get(), settings[...] and `in` read os.environ on every call, so later
+        # changes are visible there; the convenience properties below are
+        # cached_property and keep the value seen on first access until reload()
         logger.info("Initializing settings with all environment variables...")
         
         # Log key configuration variables
-        logger.info(f"LOG_LEVEL set to: {self.get('LOG_LEVEL', 'INFO')}")
-        logger.info(f"MCP_TRANSPORT_MODE set to: {self.get('MCP_TRANSPORT_MODE', 'http')}")
-        logger.info(f"MCP_SERVER_HOST set to: {self.get('MCP_SERVER_HOST', '0.0.0.0')}")
-        logger.info(f"MCP_SERVER_PORT set to: {self.get('MCP_SERVER_PORT', '8001')}")
+        logger.info("LOG_LEVEL set to: %s", self.get('LOG_LEVEL', 'INFO'))
+        logger.info("MCP_TRANSPORT_MODE set to: %s", self.get('MCP_TRANSPORT_MODE', 'http'))
+        logger.info("MCP_SERVER_HOST set to: %s", self.get('MCP_SERVER_HOST', '0.0.0.0'))
+        logger.info("MCP_SERVER_PORT set to: %s", self.get('MCP_SERVER_PORT', '8001'))
         
         def is_missing(val):
             return val is None or str(val).strip() == "" or str(val).lower() == "null" or str(val).lower() == "none"
@@ -71,9 +121,9 @@ class Settings:
         google_key = self.get('GOOGLE_API_KEY')
         google_cse = self.get('GOOGLE_CSE_ID')
         
-        logger.info(f"BRAVE_API_KEY: {'SET' if not is_missing(brave_key) else 'NOT SET'}")
-        logger.info(f"GOOGLE_API_KEY: {'SET' if not is_missing(google_key) else 'NOT SET'}")
-        logger.info(f"GOOGLE_CSE_ID: {'SET' if not is_missing(google_cse) else 'NOT SET'}")
+        logger.info("BRAVE_API_KEY: %s", 'SET' if not is_missing(brave_key) else 'NOT SET')
+        logger.info("GOOGLE_API_KEY: %s", 'SET' if not is_missing(google_key) else 'NOT SET')
+        logger.info("GOOGLE_CSE_ID: %s", 'SET' if not is_missing(google_cse) else 'NOT SET')
         
         if is_missing(brave_key):
             logger.warning("BRAVE_API_KEY is not set.")
@@ -81,50 +131,114 @@ class Settings:
             logger.warning("GOOGLE_API_KEY is not set.")
         if is_missing(google_cse):
             logger.warning("GOOGLE_CSE_ID is not set.")
+        
+        # Non-empty environment, rendered once for the startup log with secrets masked
+        self.startup_banner = "\n".join(
+            f"  {k} = {'***' if any(m in k.upper() for m in _SECRET_MARKERS) else v}"
+            for k, v in os.environ.items() if v
+        )
     
     def __getitem__(self, key):
         """Allow settings['KEY'] syntax"""
-        return self.env_vars.get(key, "")
+        return os.environ.get(key, "")
     
     def get(self, key, default=None):
         """Allow settings.get('KEY', 'default') syntax"""
-        return self.env_vars.get(key, default)
+        return os.environ.get(key, default)
     
     def __contains__(self, key):
         """Allow 'KEY' in settings syntax"""
-        return key in self.env_vars
+        return key in os.environ
     
-    # Convenience properties for commonly used variables
-    @property
+    def reload(self, *names):
+        """Re-read the .env file and drop the named cached properties.
+
+        The next access to each of `names` resolves it again. Only the settings
+        whose users re-read them (see app.core.concurrency.reload_limits) should
+        be reloaded; others were already applied at startup.
+        """
+        _reload_dotenv()
+        for name in names:
+            self.__dict__.pop(name, None)
+    
+    # Convenience properties for commonly used variables; each is resolved
+    # (and converted) once and kept until reload() drops it
+    @functools.cached_property
     def BRAVE_API_KEY(self):
         return self.get('BRAVE_API_KEY', '')
     
-    @property
+    @functools.cached_property
     def GOOGLE_API_KEY(self):
         return self.get('GOOGLE_API_KEY', '')
     
-    @property
+    @functools.cached_property
     def GOOGLE_CSE_ID(self):
         return self.get('GOOGLE_CSE_ID', '')
     
-    @property
+    @functools.cached_property
     def LOG_LEVEL(self):
         return self.get('LOG_LEVEL', 'INFO')
     
-    @property
+    @functools.cached_property
     def MCP_TRANSPORT_MODE(self):
         return self.get('MCP_TRANSPORT_MODE', 'http')
     
-    @property
+    @functools.cached_property
     def MCP_SERVER_HOST(self):
         return self.get('MCP_SERVER_HOST', '0.0.0.0')
     
-    @property
+    @functools.cached_property
     def MCP_SERVER_PORT(self):
         return int(self.get('MCP_SERVER_PORT', '8001'))
+    
+    @functools.cached_property
+    def MCP_SERVER_WORKERS(self):
+        """Uvicorn worker processes for HTTP mode (file watchers and MCP sessions are per-process)"""
+        return max(1, int(self.get('MCP_SERVER_WORKERS', '1')))
+    
+    @functools.cached_property
+    def MCP_MAX_CONCURRENCY(self):
+        """Maximum number of outbound tool calls (weather/search) in flight at once"""
+        return max(1, int(self.get('MCP_MAX_CONCURRENCY', '64')))
+    
+    @functools.cached_property
+    def BRAVE_MAX_CONCURRENT(self):
+        """Maximum Brave Search requests in flight at once"""
+        return max(1, int(self.get('BRAVE_MAX_CONCURRENT', '8')))
+    
+    @functools.cached_property
+    def BRAVE_QPS(self):
+        """Maximum Brave Search requests per second (0 = unlimited)"""
+        return float(self.get('BRAVE_QPS', '0'))
+    
+    @functools.cached_property
+    def GOOGLE_MAX_CONCURRENT(self):
+        """Maximum Google Search requests in flight at once"""
+        return max(1, int(self.get('GOOGLE_MAX_CONCURRENT', '8')))
+    
+    @functools.cached_property
+    def GOOGLE_QPS(self):
+        """Maximum Google Search requests per second (0 = unlimited)"""
+        return float(self.get('GOOGLE_QPS', '0'))
+    
+    @functools.cached_property
+    def ALLOWED_ORIGINS(self):
+        """Comma-separated CORS origins; '*' (the default) allows any origin"""
+        return [o.strip() for o in self.get('ALLOWED_ORIGINS', '*').split(',') if o.strip()]
+    
+    @functools.cached_property
+    def WEATHER_CACHE_TTL(self):
+        """Seconds to cache weather results per location (0 disables caching)"""
+        return float(self.get('WEATHER_CACHE_TTL', '300'))
+    
+    @functools.cached_property
+    def SEARCH_CACHE_TTL(self):
+        """Seconds to cache Brave/Google search results per query (0 disables caching)"""
+        return float(self.get('SEARCH_CACHE_TTL', '300'))
 
 # Now instantiate Settings with logging properly configured
 settings = Settings()
 
 logger.info("Logging configured.")
-logger.info(f"Settings loaded: MCP_TRANSPORT_MODE='{settings.MCP_TRANSPORT_MODE}', MCP_SERVER_HOST='{settings.MCP_SERVER_HOST}', MCP_SERVER_PORT={settings.MCP_SERVER_PORT}")
+logger.info("Settings loaded: MCP_TRANSPORT_MODE='%s', MCP_SERVER_HOST='%s', MCP_SERVER_PORT=%s",
+            settings.MCP_TRANSPORT_MODE, settings.MCP_SERVER_HOST, settings.MCP_SERVER_PORT)
@@ -0,0 +1,108 @@
+"""
+Async TTL cache for outbound tool calls.
+
+Caches the results of coroutine functions for a fixed time-to-live and
+de-duplicates concurrent calls for the same key, so a burst of identical
+requests results in a single upstream call ("single flight").
+"""
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class AsyncTTLCache:
+    """TTL + LRU cache for coroutine results with in-flight request coalescing."""
+
+    def __init__(self, ttl: float, maxsize: int = 1024,
+                 cache_if: Optional[Callable[[Any], bool]] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.cache_if = cache_if
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, or await fetch() once and cache its result.
+
+        If the caller running fetch() is cancelled, callers waiting on it are
+        not: they retry, and one of them runs fetch() in its place.
+        """
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    logger.debug("Cache hit for %r", key)
+                    return value
+                del self._entries[key]
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            logger.debug("Joining in-flight request for %r", key)
+            # asyncio.wait() never cancels inflight and only raises if this
+            # caller is itself cancelled
+            await asyncio.wait((inflight,))
+            if not inflight.cancelled():
+                return inflight.result()
+            logger.debug("In-flight request for %r was cancelled; retrying", key)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Mark retrieved; waiters (if any) still get it
+            raise
+        finally:
+            del self._inflight[key]
+
+        future.set_result(value)
+        if self.ttl > 0 and (self.cache_if is None or self.cache_if(value)):
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def cached(self, key: Callable[..., Hashable]):
+        """Decorate a coroutine function so its calls go through this cache.
+
+        `key` receives the same arguments as the decorated function and returns
+        the cache key for that call. The cache is available as `wrapper.cache`.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await self.get_or_fetch(key(*args, **kwargs), lambda: func(*args, **kwargs))
+            wrapper.cache = self
+            return wrapper
+        return decorator
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters; joined in-flight requests count as neither."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "inflight": len(self._inflight),
+        }
+
+    def clear(self):
+        """Drop all cached entries (in-flight requests are unaffected)."""
+        self._entries.clear()
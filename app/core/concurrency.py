@@ -0,0 +1,94 @@
+"""
+Admission control for outbound tool calls.
+
+Caps how many calls run at once so a burst of MCP requests cannot flood the
+upstream services. Built on an `asyncio.Condition` and a counter rather than a
+Semaphore so the limit can be changed at runtime: limiters created with
+`resizable_limiter` follow their setting when `reload_limits()` runs (on
+SIGHUP, see app.main). `outbound_limiter` is the process-wide cap;
+`get_with_retries` takes it around each upstream request attempt, after the
+caller's cache lookup and per-engine limits. `RateLimiter` additionally spaces
+calls out to stay under an upstream's requests-per-second quota.
+"""
+import asyncio
+import logging
+from typing import List, Tuple
+
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ConcurrencyLimiter:
+    """Async context manager admitting at most `limit` concurrent holders."""
+
+    def __init__(self, limit: int):
+        self._limit = max(1, limit)
+        self._active = 0
+        self._cond = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    async def set_limit(self, limit: int):
+        """Change the limit; waiters are woken if it was raised."""
+        async with self._cond:
+            self._limit = max(1, limit)
+            self._cond.notify_all()
+
+    async def __aenter__(self):
+        async with self._cond:
+            if self._active >= self._limit:
+                logger.debug("Concurrency limit %d reached, waiting", self._limit)
+                await self._cond.wait_for(lambda: self._active < self._limit)
+            self._active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify(1)
+
+# (limiter, name of the settings property that sizes it)
+_resizable: List[Tuple[ConcurrencyLimiter, str]] = []
+
+def resizable_limiter(setting: str) -> ConcurrencyLimiter:
+    """Create a limiter sized by the named setting that reload_limits() keeps in sync."""
+    limiter = ConcurrencyLimiter(getattr(settings, setting))
+    _resizable.append((limiter, setting))
+    return limiter
+
+async def reload_limits():
+    """Re-read the limit settings and resize every limiter made by resizable_limiter()."""
+    names = {setting for _, setting in _resizable}
+    settings.reload(*names)
+    for limiter, setting in _resizable:
+        new_limit = getattr(settings, setting)
+        if new_limit != limiter.limit:
+            logger.info("%s changed from %d to %d", setting, limiter.limit, new_limit)
+            await limiter.set_limit(new_limit)
+
+# Process-wide cap on concurrent upstream requests (all tools together)
+outbound_limiter = resizable_limiter("MCP_MAX_CONCURRENCY")
+
+class RateLimiter:
+    """Spaces acquisitions at least 1/rate seconds apart; rate <= 0 disables it."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        """Wait for the next free slot (slots are reserved in call order)."""
+        if not self._interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            logger.debug("Rate limit reached, waiting %.3fs", slot - now)
+            await asyncio.sleep(slot - now)
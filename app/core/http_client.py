@@ -0,0 +1,111 @@
+"""
+Process-wide httpx client for outbound tool calls.
+
+All tools share one pooled `httpx.AsyncClient` so repeated calls to the same
+upstream reuse keep-alive connections instead of paying a TCP + TLS handshake
+per request. The client is created lazily on first use (which also covers
+stdio mode, where there is no HTTP lifespan) and closed on shutdown.
+
+Failed connection attempts are retried by the transport; throttled or
+temporarily unavailable responses (429/5xx) are retried by `get_with_retries`
+after the delay the server asks for. Every attempt is admitted separately
+(caller's limiter, rate limiter, then the process-wide `outbound_limiter`), so
+no slot is held while waiting to retry and retries count against the QPS limit.
+"""
+import asyncio
+import contextlib
+import logging
+import random
+from typing import Optional
+
+import httpx
+
+from app.core.concurrency import ConcurrencyLimiter, RateLimiter, outbound_limiter
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional `h2` package (`pip install httpx[http2]`)
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+_CONNECT_RETRIES = 2
+_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+_MAX_RETRIES = 3
+_MAX_RETRY_DELAY = 8.0
+
+# Error bodies (often whole HTML pages) are cut to this many bytes for logs/results
+_EXCERPT_BYTES = 1024
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            # Pool settings live on the transport once one is passed explicitly
+            transport=httpx.AsyncHTTPTransport(
+                http2=_HTTP2_AVAILABLE,
+                # Search/weather calls are sporadic; keep idle connections longer than
+                # httpx's 5 s default so the next call still finds one open
+                limits=httpx.Limits(max_keepalive_connections=64, max_connections=128,
+                                    keepalive_expiry=30.0),
+                retries=_CONNECT_RETRIES,
+            ),
+            timeout=10.0,
+        )
+        logger.debug("Created shared HTTP client (http2=%s)", _HTTP2_AVAILABLE)
+    return _client
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying: Retry-After if given, else exponential backoff."""
+    backoff = 0.5 * 2 ** attempt
+    try:
+        delay = float(response.headers.get("Retry-After", backoff))
+    except ValueError:  # HTTP-date form; not worth parsing for a short wait
+        delay = backoff
+    return min(max(delay, 0.0), _MAX_RETRY_DELAY) + random.uniform(0, 0.25)
+
+async def _admitted_get(url: str, limiter: Optional[ConcurrencyLimiter],
+                        rate: Optional[RateLimiter], kwargs) -> httpx.Response:
+    """One GET, holding the caller's limiter and an outbound slot only for its duration."""
+    async with limiter if limiter is not None else contextlib.nullcontext():
+        if rate is not None:
+            await rate.acquire()
+        async with outbound_limiter:
+            return await get_http_client().get(url, **kwargs)
+
+async def get_with_retries(url: str, *, limiter: Optional[ConcurrencyLimiter] = None,
+                           rate: Optional[RateLimiter] = None, **kwargs) -> httpx.Response:
+    """GET through the shared client, retrying throttled/unavailable responses.
+
+    Each attempt takes `limiter` (if given), waits for a `rate` slot (if
+    given) and takes an `outbound_limiter` slot; all are released before a
+    retry delay. Returns the last response once retries are exhausted, so
+    callers handle the final status exactly as they would without retries.
+    """
+    for attempt in range(_MAX_RETRIES):
+        response = await _admitted_get(url, limiter, rate, kwargs)
+        if response.status_code not in _RETRY_STATUSES:
+            return response
+        delay = _retry_delay(response, attempt)
+        logger.warning("GET %s returned %d, retrying in %.2fs (attempt %d/%d)",
+                       response.url.copy_remove_param("key"), response.status_code,
+                       delay, attempt + 1, _MAX_RETRIES)
+        await asyncio.sleep(delay)
+    return await _admitted_get(url, limiter, rate, kwargs)
+
+def response_excerpt(response: httpx.Response) -> str:
+    """First _EXCERPT_BYTES of the body as text, without decoding the rest."""
+    return response.content[:_EXCERPT_BYTES].decode(response.encoding or "utf-8", "replace")
+
+async def aclose_http_client():
+    """Close the shared AsyncClient, if one was created."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+        logger.debug("Closed shared HTTP client")
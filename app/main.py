@@ -1,11 +1,27 @@
+import asyncio
 import contextlib
+import functools
+import inspect
 import logging
-import os
+import signal
 import sys
-import json
+import orjson
+
+# Use the libuv-based event loop where available (not supported on Windows).
+# Installed before anything creates a loop so FastMCP's tasks run on it too.
+if sys.platform != "win32":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
 from collections.abc import AsyncIterator
+from uuid import uuid4
 from fastapi import FastAPI, Request # Request might be used by FastAPI internally or other parts
 from app.config.config import settings as app_settings_instance
+from app.core.concurrency import reload_limits
+from app.core.http_client import aclose_http_client
 from app.tools.weather import get_weather
 from app.tools.web_search import search_brave, search_google
 # File watcher imports
@@ -15,71 +31,133 @@ from app.tools.file_watcher import (
 )
 from app.tools.file_watcher_sse import setup_watcher_sse_callback, create_sse_response
 from mcp.server.fastmcp import FastMCP
-from typing import List, Optional
+from starlette.routing import Mount, Route
+from typing import Any, Dict, List, Optional
 
 # Logging is now configured in app.config.config
 logger = logging.getLogger(__name__)
 
+def _dump(obj) -> str:
+    """Serialize a tool result to a JSON string (orjson also handles datetimes)."""
+    return orjson.dumps(obj).decode()
+
+def _as_text(result) -> str:
+    """Return a tool result as text: strings as-is, anything else as JSON."""
+    return result if isinstance(result, str) else _dump(result)
+
+def _log_cache_stats() -> None:
+    """Log hit/miss counters of the outbound tool caches (called at shutdown)."""
+    # search_brave and search_google share one cache
+    for name, cache in (("Weather", get_weather.cache), ("Search", search_brave.cache)):
+        logger.info("%s cache stats: %s", name, cache.stats)
+
+@contextlib.asynccontextmanager
+async def _reload_limits_on_sighup() -> AsyncIterator[None]:
+    """While active, SIGHUP re-reads the concurrency limit settings (POSIX only).
+
+    Lets MCP_MAX_CONCURRENCY / BRAVE_MAX_CONCURRENT / GOOGLE_MAX_CONCURRENT be
+    changed in .env without restarting the server.
+    """
+    loop = asyncio.get_running_loop()
+    pending = set()  # Keeps reload tasks referenced until they finish
+
+    def on_sighup():
+        task = loop.create_task(reload_limits())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    try:
+        loop.add_signal_handler(signal.SIGHUP, on_sighup)
+    except (AttributeError, NotImplementedError, RuntimeError, ValueError) as e:
+        # No SIGHUP on Windows; signal handlers need the main thread
+        logger.debug("Limit reload on SIGHUP unavailable: %s", e)
+        yield
+        return
+    try:
+        yield
+    finally:
+        loop.remove_signal_handler(signal.SIGHUP)
+
+def mcp_json_tool(error_message: str):
+    """Serialize a tool's result to JSON and turn exceptions into the standard error envelope.
+
+    The decorated tool returns the payload; the wrapper returns it as a JSON
+    string. `error_message` prefixes the exception text in the error response.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs) -> str:
+            try:
+                return _dump(await fn(*args, **kwargs))
+            except Exception as e:
+                logger.exception("Tool '%s' failed", fn.__name__)
+                return _dump({"status": "error", "message": f"{error_message}: {e}"})
+        # The wrapper returns JSON text whatever fn returns. Report that in its
+        # annotations and in inspect.signature(), which would otherwise follow
+        # __wrapped__ to fn's own return type.
+        wrapper.__annotations__ = {**fn.__annotations__, "return": str}
+        wrapper.__signature__ = inspect.signature(fn).replace(return_annotation=str)
+        return wrapper
+    return decorator
+
 mcp_server = FastMCP(
     name="Benraz-MCP-Server",
     description="An MCP server using FastMCP"
 )
 
-@mcp_server.tool()
 async def weather(location: str) -> str:
     """Get the current weather for a location.
     
     Args:
         location: The city and state, e.g., San Francisco, CA
     """
-    logger.info(f"Executing weather tool for location: {location}")
+    logger.info("Executing weather tool for location: %s", location)
     result = await get_weather(location)
-    logger.debug(f"Weather tool result: {result}")
-    return str(result)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Weather tool result: %s", result)
+    return _as_text(result)
 
-if app_settings_instance.BRAVE_API_KEY:
-    @mcp_server.tool()
-    async def brave_search_tool(query: str, count: int = 10, sites: Optional[List[str]] = None) -> str:
-        """Search the web with Brave Search. Optionally restrict to a list of websites.
-        
-        Args:
-            query: The search query.
-            count: Number of search results to return (default: 10, max: 20).
-            sites (optional): List of website domains/URLs to restrict the search to. If not provided, search is not restricted.
-        Example:
-            brave_search_tool(query="AI news", sites=["wired.com", "arstechnica.com"])
-        """
-        logger.info(f"Executing Brave search tool for query: {query}, count: {count}, sites: {sites}")
-        result = await search_brave(query, count, sites)
-        logger.debug(f"Brave search result: {result}")
-        return str(result)
-
-if app_settings_instance.GOOGLE_API_KEY and app_settings_instance.GOOGLE_CSE_ID:
-    @mcp_server.tool()
-    async def google_search_tool(query: str, count: int = 10, sites: Optional[List[str]] = None) -> str:
-        """Search the web with Google Search. Optionally restrict to a list of websites.
-        
-        Args:
-            query: The search query.
-            count: Number of search results to return (default: 10, max: 10).
-            sites (optional): List of website domains/URLs to restrict the search to. If not provided, search is not restricted.
-        Example:
-            google_search_tool(query="AI news", sites=["wired.com", "arstechnica.com"])
-        """
-        logger.info(f"Executing Google search tool for query: {query}, count: {count}, sites: {sites}")
-        result = await search_google(query, count, sites)
-        logger.debug(f"Google search result: {result}")
-        return str(result)
+async def brave_search_tool(query: str, count: int = 10, sites: Optional[List[str]] = None) -> str:
+    """Search the web with Brave Search. Optionally restrict to a list of websites.
+    
+    Args:
+        query: The search query.
+        count: Number of search results to return (default: 10, max: 20).
+        sites (optional): List of website domains/URLs to restrict the search to. If not provided, search is not restricted.
+    Example:
+        brave_search_tool(query="AI news", sites=["wired.com", "arstechnica.com"])
+    """
+    logger.info("Executing Brave search tool for query: %s, count: %d, sites: %s", query, count, sites)
+    result = await search_brave(query, count, sites)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Brave search result: %s", result)
+    return _as_text(result)
+
+async def google_search_tool(query: str, count: int = 10, sites: Optional[List[str]] = None) -> str:
+    """Search the web with Google Search. Optionally restrict to a list of websites.
+    
+    Args:
+        query: The search query.
+        count: Number of search results to return (default: 10, max: 10).
+        sites (optional): List of website domains/URLs to restrict the search to. If not provided, search is not restricted.
+    Example:
+        google_search_tool(query="AI news", sites=["wired.com", "arstechnica.com"])
+    """
+    logger.info("Executing Google search tool for query: %s, count: %d, sites: %s", query, count, sites)
+    result = await search_google(query, count, sites)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Google search result: %s", result)
+    return _as_text(result)
 
 # File Watcher Tools
-@mcp_server.tool()
+@mcp_json_tool("Error creating file watcher")
 async def create_watcher(watcher_id: str, watch_path: str, 
                         file_patterns: Optional[List[str]] = None,
                         exclude_patterns: Optional[List[str]] = None,
                         specific_files: Optional[List[str]] = None,
                         recursive: bool = True,
                         include_directories: bool = True,
-                        auto_start: bool = True) -> str:
+                        auto_start: bool = True) -> Dict[str, Any]:
     """Create a new file watcher to monitor file system changes.
     
     Args:
@@ -95,34 +173,32 @@ async def create_watcher(watcher_id: str, watch_path: str,
     Returns:
         JSON string with watcher creation result
     """
-    try:
-        logger.info(f"Creating file watcher '{watcher_id}' for path: {watch_path}")
-        
-        result = await create_file_watcher(
-            watcher_id=watcher_id,
-            watch_path=watch_path,
-            file_patterns=file_patterns,
-            exclude_patterns=exclude_patterns,
-            specific_files=specific_files,
-            recursive=recursive,
-            include_directories=include_directories
-        )
-        
-        # Setup SSE callback for real-time notifications
+    logger.info("Creating file watcher '%s' for path: %s", watcher_id, watch_path)
+    
+    result = await create_file_watcher(
+        watcher_id=watcher_id,
+        watch_path=watch_path,
+        file_patterns=file_patterns,
+        exclude_patterns=exclude_patterns,
+        specific_files=specific_files,
+        recursive=recursive,
+        include_directories=include_directories
+    )
+    
+    # Setup SSE callback for real-time notifications and, if requested,
+    # start the watcher; the two are independent so run them together.
+    # The callback is scheduled first so no early events are missed.
+    if auto_start:
+        await asyncio.gather(setup_watcher_sse_callback(watcher_id),
+                             start_file_watcher(watcher_id))
+        result['auto_started'] = True
+    else:
         await setup_watcher_sse_callback(watcher_id)
-        
-        if auto_start:
-            await start_file_watcher(watcher_id)
-            result['auto_started'] = True
-        
-        return json.dumps({"status": "success", "message": f"Successfully created file watcher: {watcher_id}", "details": result})
     
-    except Exception as e:
-        logger.error(f"Error creating file watcher '{watcher_id}': {e}")
-        return json.dumps({"status": "error", "message": f"Error creating file watcher: {str(e)}"})
+    return {"status": "success", "message": f"Successfully created file watcher: {watcher_id}", "details": result}
 
-@mcp_server.tool()
-async def start_watcher_tool(watcher_id: str) -> str:
+@mcp_json_tool("Error starting file watcher")
+async def start_watcher_tool(watcher_id: str) -> Dict[str, Any]:
     """Start a file watcher by ID.
     
     Args:
@@ -131,16 +207,12 @@ async def start_watcher_tool(watcher_id: str) -> str:
     Returns:
         JSON string with start result
     """
-    try:
-        result = await start_file_watcher(watcher_id)
-        logger.info(f"Started file watcher '{watcher_id}'")
-        return json.dumps({"status": "success", "message": f"Successfully started file watcher: {watcher_id}", "details": result})
-    except Exception as e:
-        logger.error(f"Error starting file watcher '{watcher_id}': {e}")
-        return json.dumps({"status": "error", "message": f"Error starting file watcher: {str(e)}"})
-
-@mcp_server.tool()
-async def stop_watcher_tool(watcher_id: str) -> str:
+    result = await start_file_watcher(watcher_id)
+    logger.info("Started file watcher '%s'", watcher_id)
+    return {"status": "success", "message": f"Successfully started file watcher: {watcher_id}", "details": result}
+
+@mcp_json_tool("Error stopping file watcher")
+async def stop_watcher_tool(watcher_id: str) -> Dict[str, Any]:
     """Stop a file watcher by ID.
     
     Args:
@@ -149,16 +221,12 @@ async def stop_watcher_tool(watcher_id: str) -> str:
     Returns:
         JSON string with stop result
     """
-    try:
-        result = await stop_file_watcher(watcher_id)
-        logger.info(f"Stopped file watcher '{watcher_id}'")
-        return json.dumps({"status": "success", "message": f"Successfully stopped file watcher: {watcher_id}", "details": result})
-    except Exception as e:
-        logger.error(f"Error stopping file watcher '{watcher_id}': {e}")
-        return json.dumps({"status": "error", "message": f"Error stopping file watcher: {str(e)}"})
-
-@mcp_server.tool()
-async def remove_watcher_tool(watcher_id: str) -> str:
+    result = await stop_file_watcher(watcher_id)
+    logger.info("Stopped file watcher '%s'", watcher_id)
+    return {"status": "success", "message": f"Successfully stopped file watcher: {watcher_id}", "details": result}
+
+@mcp_json_tool("Error removing file watcher")
+async def remove_watcher_tool(watcher_id: str) -> Dict[str, Any]:
     """Remove a file watcher by ID.
     
     Args:
@@ -167,35 +235,27 @@ async def remove_watcher_tool(watcher_id: str) -> str:
     Returns:
         Result message
     """
-    try:
-        success = await remove_file_watcher(watcher_id)
-        if success:
-            logger.info(f"Removed file watcher '{watcher_id}'")
-            return json.dumps({"status": "success", "message": f"Successfully removed file watcher '{watcher_id}'"})
-        else:
-            logger.warning(f"Attempted to remove non-existent file watcher '{watcher_id}'")
-            return json.dumps({"status": "error", "message": f"File watcher '{watcher_id}' not found"})
-    except Exception as e:
-        logger.error(f"Error removing file watcher '{watcher_id}': {e}")
-        return json.dumps({"status": "error", "message": f"Error removing file watcher: {str(e)}"})
-
-@mcp_server.tool()
-async def list_watchers_tool() -> str:
+    success = await remove_file_watcher(watcher_id)
+    if success:
+        logger.info("Removed file watcher '%s'", watcher_id)
+        return {"status": "success", "message": f"Successfully removed file watcher '{watcher_id}'"}
+    else:
+        logger.warning("Attempted to remove non-existent file watcher '%s'", watcher_id)
+        return {"status": "error", "message": f"File watcher '{watcher_id}' not found"}
+
+@mcp_json_tool("Error listing file watchers")
+async def list_watchers_tool() -> List[Dict[str, Any]]:
     """List all file watchers and their status.
     
     Returns:
         JSON string with all watchers information
     """
-    try:
-        watchers = await list_file_watchers()
-        logger.info(f"Listed {len(watchers)} file watchers")
-        return json.dumps(watchers)
-    except Exception as e:
-        logger.error(f"Error listing file watchers: {e}")
-        return json.dumps({"status": "error", "message": f"Error listing file watchers: {str(e)}"})
-
-@mcp_server.tool()
-async def get_watcher_status_tool(watcher_id: str) -> str:
+    watchers = await list_file_watchers()
+    logger.info("Listed %d file watchers", len(watchers))
+    return watchers
+
+@mcp_json_tool("Error getting watcher status")
+async def get_watcher_status_tool(watcher_id: str) -> Dict[str, Any]:
     """Get detailed status of a specific file watcher.
     
     Args:
@@ -204,41 +264,41 @@ async def get_watcher_status_tool(watcher_id: str) -> str:
     Returns:
         JSON string with watcher status
     """
-    try:
-        status = await get_file_watcher_status(watcher_id)
-        logger.info(f"Retrieved status for file watcher '{watcher_id}'")
-        return json.dumps(status)
-    except Exception as e:
-        logger.error(f"Error getting status for file watcher '{watcher_id}': {e}")
-        return json.dumps({"status": "error", "message": f"Error getting watcher status: {str(e)}"})
+    status = await get_file_watcher_status(watcher_id)
+    logger.info("Retrieved status for file watcher '%s'", watcher_id)
+    return status
+
+def _register_tools(server: FastMCP, settings) -> None:
+    """Register the MCP tools with the server; search tools only when their API keys are configured."""
+    server.tool()(weather)
+    if settings.BRAVE_API_KEY:
+        server.tool()(brave_search_tool)
+    if settings.GOOGLE_API_KEY and settings.GOOGLE_CSE_ID:
+        server.tool()(google_search_tool)
+    for tool in (create_watcher, start_watcher_tool, stop_watcher_tool,
+                 remove_watcher_tool, list_watchers_tool, get_watcher_status_tool):
+        server.tool()(tool)
+
+_register_tools(mcp_server, app_settings_instance)
 
 # FastAPI lifespan to manage FastMCP session manager
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Manage FastMCP session manager lifecycle"""
-    async with mcp_server.session_manager.run():
+    async with mcp_server.session_manager.run(), _reload_limits_on_sighup():
         logger.info("FastMCP session manager started")
         
         # Log application startup and routes here
         logger.info("FastAPI application startup complete.")
-        logger.info(f"MCP Transport Mode from settings: {app_settings_instance.MCP_TRANSPORT_MODE}")
+        logger.info("MCP Transport Mode from settings: %s", app_settings_instance.MCP_TRANSPORT_MODE)
         if app_settings_instance.MCP_TRANSPORT_MODE != "stdio":
-            logger.info(f"MCP Server (HTTP/SSE) available at /mcp endpoint on host {app_settings_instance.MCP_SERVER_HOST}:{app_settings_instance.MCP_SERVER_PORT}")
-
-        # Log all registered routes
-        logger.info("Registered routes:")
-        from starlette.routing import Mount 
-        for route_entry in app.routes:
-            if hasattr(route_entry, "path") and not isinstance(route_entry, Mount):
-                methods_str = str(list(route_entry.methods)) if hasattr(route_entry, 'methods') and route_entry.methods is not None else 'N/A'
-                logger.info(f"  Route: Path='{route_entry.path}', Name='{route_entry.name if hasattr(route_entry, 'name') else 'N/A'}', Methods={methods_str}")
-            elif isinstance(route_entry, Mount):
-                logger.info(f"  Mount: Path='{route_entry.path}', AppName='{route_entry.name if hasattr(route_entry, 'name') else 'N/A'}'")
+            logger.info("MCP Server (HTTP/SSE) available at /mcp endpoint on host %s:%s",
+                        app_settings_instance.MCP_SERVER_HOST, app_settings_instance.MCP_SERVER_PORT)
+
+        # Log all registered routes (table built once at import)
+        logger.info("Registered routes:\n%s", _ROUTES_LOG)
         
-        logger.info("Loaded settings with non-empty values:")
-        for k, v in app_settings_instance.env_vars.items():
-            if v:
-                logger.info(f"  {k} = {v}")
+        logger.info("Loaded settings with non-empty values:\n%s", app_settings_instance.startup_banner)
         
         yield
         
@@ -249,100 +309,145 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
             await file_watcher_manager.cleanup_all()
             logger.info("File watchers cleanup completed")
         except Exception as e:
-            logger.error(f"Error during file watchers cleanup: {e}")
+            logger.error("Error during file watchers cleanup: %s", e)
+
+        _log_cache_stats()
+        await aclose_http_client()
             
     logger.info("FastMCP session manager stopped")
 
 # Use FastMCP's streamable HTTP app as the primary application
 app = mcp_server.streamable_http_app()
+# Replace FastMCP's default lifespan (which only runs the session manager)
+# with ours, so startup logging and file-watcher cleanup actually run
+app.router.lifespan_context = lifespan
 
 # Add CORS middleware for browser compatibility
 from starlette.middleware.cors import CORSMiddleware
+# Explicit lists let CORSMiddleware build its headers once at startup instead of
+# echoing request values per call. Credentials stay off: no cookie auth is used,
+# and browsers reject a wildcard origin combined with credentials anyway.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=app_settings_instance.ALLOWED_ORIGINS,  # In production, specify exact origins
+    allow_credentials=False,
+    allow_methods=["GET", "POST", "DELETE", "HEAD"],
+    allow_headers=["content-type", "authorization", "mcp-session-id", "mcp-protocol-version", "last-event-id"],
+    expose_headers=["mcp-session-id"],
 )
 
 # FastMCP apps are Starlette apps, so we need to add routes differently
-from starlette.routing import Route
-from starlette.responses import JSONResponse
+from starlette.responses import Response
+
+# The bodies of the health/ping/info endpoints never change while the process
+# runs, so serialize them once here instead of on every (frequent) probe.
+# Only the bytes are shared; a fresh Response is built per request because
+# middleware (e.g. CORS) mutates response headers in place.
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "server": "MCP Server with FastMCP", "version": "1.0.0"})
+_PING_BODY = orjson.dumps({"message": "pong"})
+_INFO_BODY = orjson.dumps({
+    "name": "Benraz-MCP-Server",
+    "description": "An MCP server using FastMCP",
+    "transport_mode": app_settings_instance.MCP_TRANSPORT_MODE,
+    "endpoints": {
+        "health": "/health",
+        "info": "/info",
+        "ping": "/ping",
+        "file_watcher_sse": "/file-watcher/sse"
+    },
+    "tools": ["weather", "brave_search_tool", "google_search_tool", 
+             "create_watcher", "start_watcher_tool", "stop_watcher_tool",
+             "remove_watcher_tool", "list_watchers_tool", "get_watcher_status_tool"]
+})
 
 async def health_check(request):
     """Health check endpoint"""
-    return JSONResponse({"status": "healthy", "server": "MCP Server with FastMCP", "version": "1.0.0"})
+    return Response(_HEALTH_BODY, media_type="application/json")
 
 async def ping(request):
     """Basic ping endpoint"""
-    return JSONResponse({"message": "pong"})
+    return Response(_PING_BODY, media_type="application/json")
+
+# HEAD probes (e.g. container liveness checks) get headers only; the
+# content-length matches what the GET handler would send.
+_HEALTH_HEAD_HEADERS = {"content-type": "application/json", "content-length": str(len(_HEALTH_BODY))}
+_PING_HEAD_HEADERS = {"content-type": "application/json", "content-length": str(len(_PING_BODY))}
+
+async def health_check_head(request):
+    """Health check endpoint (HEAD)"""
+    return Response(b"", headers=_HEALTH_HEAD_HEADERS)
+
+async def ping_head(request):
+    """Basic ping endpoint (HEAD)"""
+    return Response(b"", headers=_PING_HEAD_HEADERS)
 
 async def server_info(request):
     """Server information endpoint"""
-    return JSONResponse({
-        "name": "Benraz-MCP-Server",
-        "description": "An MCP server using FastMCP",
-        "transport_mode": app_settings_instance.MCP_TRANSPORT_MODE,
-        "endpoints": {
-            "health": "/health",
-            "info": "/info",
-            "ping": "/ping",
-            "file_watcher_sse": "/file-watcher/sse"
-        },
-        "tools": ["weather", "brave_search_tool", "google_search_tool", 
-                 "create_watcher", "start_watcher_tool", "stop_watcher_tool",
-                 "remove_watcher_tool", "list_watchers_tool", "get_watcher_status_tool"]
-    })
+    return Response(_INFO_BODY, media_type="application/json")
 
 async def file_watcher_sse_endpoint(request):
     """SSE endpoint for file watcher events"""
-    import uuid
-    from fastapi import Query
-    
     # Generate unique client ID
-    client_id = str(uuid.uuid4())
+    client_id = uuid4().hex
     
     # Get watcher IDs from query parameters (comma-separated)
     watcher_ids_param = request.query_params.get('watchers', '')
-    watcher_ids = [w.strip() for w in watcher_ids_param.split(',') if w.strip()] if watcher_ids_param else None
+    watcher_ids = list(filter(None, map(str.strip, watcher_ids_param.split(',')))) if watcher_ids_param else None
     
-    logger.info(f"Starting SSE stream for client '{client_id}' with watchers: {watcher_ids}")
+    logger.info("Starting SSE stream for client '%s' with watchers: %s", client_id, watcher_ids)
     
-    return create_sse_response(client_id, watcher_ids)
+    return create_sse_response(client_id, watcher_ids, request)
 
 # Add our custom routes to the FastMCP app
 app.routes.extend([
-    Route("/health", health_check, methods=["GET", "HEAD"]),
-    Route("/ping", ping, methods=["GET", "HEAD"]),
+    # HEAD routes come first: Starlette also lets GET routes answer HEAD
+    Route("/health", health_check_head, methods=["HEAD"]),
+    Route("/health", health_check, methods=["GET"]),
+    Route("/ping", ping_head, methods=["HEAD"]),
+    Route("/ping", ping, methods=["GET"]),
     Route("/info", server_info, methods=["GET"]),
     Route("/file-watcher/sse", file_watcher_sse_endpoint, methods=["GET"])
 ])
 
+def _format_route(route) -> Optional[str]:
+    """Render one route for the startup route table (None for untyped routes)."""
+    if isinstance(route, Route):
+        return f"  Route: Path='{route.path}', Name='{route.name}', Methods={sorted(route.methods or ())}"
+    if isinstance(route, Mount):
+        return f"  Mount: Path='{route.path}', AppName='{route.name}'"
+    return None
+
+# The route set is fixed from here on, so render the startup log table once
+_ROUTES_LOG = "\n".join(filter(None, map(_format_route, app.routes)))
+
+async def _run_stdio() -> None:
+    """Serve MCP over stdio, releasing shared resources on exit like the HTTP lifespan does."""
+    try:
+        async with _reload_limits_on_sighup():
+            await mcp_server.run_stdio_async()
+    finally:
+        _log_cache_stats()
+        await aclose_http_client()
+
 if __name__ == "__main__":
     # This block is primarily for stdio mode or direct execution.
     # Uvicorn for HTTP/SSE mode is typically launched via run.py.
     
-    # Ensure logging is configured if running this file directly
-    # (config.py should have already done this if imported, but as a safeguard)
-    if not logging.getLogger().hasHandlers():
-        logging.basicConfig(stream=sys.stdout, 
-                            level=app_settings_instance.LOG_LEVEL.upper(), 
-                            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-    logger.info(f"Executing app/main.py directly (__name__ == '__main__')")
-    logger.info(f"MCP_TRANSPORT_MODE from settings: {app_settings_instance.MCP_TRANSPORT_MODE}")
+    # Logging is already configured by app.config.config on import.
+    logger.info("Executing app/main.py directly (__name__ == '__main__')")
+    logger.info("MCP_TRANSPORT_MODE from settings: %s", app_settings_instance.MCP_TRANSPORT_MODE)
 
     if app_settings_instance.MCP_TRANSPORT_MODE == "stdio":
         logger.info("Starting MCP server in stdio mode via FastMCP.")
         # For stdio mode, FastMCP takes over the stdin/stdout.
         # No FastAPI app or Uvicorn server is run in this case.
-        mcp_server.run(transport="stdio") # This is a blocking call
+        asyncio.run(_run_stdio())  # Uses the uvloop policy installed at import
         logger.info("MCP server (stdio mode) finished.")
     else:
         logger.info("Running app/main.py directly in non-stdio mode.")
         logger.info("This typically means Uvicorn should be used (e.g., via run.py) to serve the FastAPI app.")
-        logger.info(f"To run in HTTP/SSE mode, execute: uvicorn app.main:app --host {app_settings_instance.MCP_SERVER_HOST} --port {app_settings_instance.MCP_SERVER_PORT} --reload")
+        logger.info("To run in HTTP/SSE mode, execute: uvicorn app.main:app --host %s --port %s --reload",
+                    app_settings_instance.MCP_SERVER_HOST, app_settings_instance.MCP_SERVER_PORT)
         # If you want to run uvicorn directly from here for http mode when __name__ == "__main__":
         # import uvicorn
         # uvicorn.run(app, host=app_settings_instance.MCP_SERVER_HOST, port=app_settings_instance.MCP_SERVER_PORT)
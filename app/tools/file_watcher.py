@@ -5,40 +5,122 @@ This module provides file watching capabilities with real-time notifications
 through MCP's SSE (Server-Sent Events) system.
 """
 import asyncio
+import functools
 import logging
 import os
 import fnmatch
+import re
+import sys
+import time
 from pathlib import Path
 from typing import Dict, List, Optional, Set, Any, Callable
 from datetime import datetime
 from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
-import json
 import threading
 
 logger = logging.getLogger(__name__)
 
+def _compile_patterns(patterns: List[str]) -> Optional["re.Pattern[str]"]:
+    """Compile glob patterns into one alternation regex (None if there are none).
+
+    Uses the same case normalization as fnmatch.fnmatch.
+    """
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(os.path.normcase(p)) for p in patterns))
+
+if Observer is PollingObserver:
+    logger.warning("No native file system notification backend available; file watchers will poll")
+
+def _watch_targets(abs_path: str, specific_files: Set[str], recursive: bool) -> List[tuple]:
+    """Return the (directory, recursive) pairs to schedule for a watcher.
+
+    With specific files, only their parent directories are watched
+    (non-recursively) instead of the whole tree under abs_path.
+    """
+    if specific_files:
+        # join() adds the trailing separator only when missing, so a root
+        # like "/" stays "/" rather than becoming "//"
+        prefix = os.path.join(abs_path, "")
+        parents = {
+            os.path.dirname(f) for f in specific_files
+            if f.startswith(prefix)
+        }
+        if not recursive:
+            parents &= {abs_path}
+        parents = [d for d in parents if os.path.isdir(d)]
+        if parents:
+            return [(d, False) for d in sorted(parents)]
+    return [(abs_path, recursive)]
+
+# Niceness added to watchdog threads so an event flood can't starve the asyncio loop
+_OBSERVER_NICE_INCREMENT = 5
+
+def _deprioritize_observer(observer: Observer):
+    """Lower the scheduling priority of a started observer's threads (Linux only).
+
+    Linux applies nice values per thread, so this leaves the event loop thread
+    at normal priority. Elsewhere, or without permission, it is a no-op.
+    """
+    if not sys.platform.startswith("linux"):
+        return
+    for thread in (observer, *observer.emitters):
+        try:
+            nice = os.getpriority(os.PRIO_PROCESS, thread.native_id)
+            os.setpriority(os.PRIO_PROCESS, thread.native_id, nice + _OBSERVER_NICE_INCREMENT)
+        except (OSError, TypeError) as e:
+            logger.debug("Could not lower priority of watcher thread %s: %s", thread.name, e)
+
+@functools.lru_cache(maxsize=4096)
+def _resolve_path(path: str) -> str:
+    """Resolve a path (symlinks, '..') once; repeated events reuse the result."""
+    return str(Path(path).resolve())
+
 class FileWatcherEvent:
     """Represents a file system event with additional metadata."""
+    __slots__ = ("event_type", "path", "is_directory", "src_path", "filename",
+                 "parent_dir", "_timestamp", "timestamp_ns")
     
     def __init__(self, event_type: str, path: str, is_directory: bool = False, 
                  src_path: str = None, timestamp: datetime = None):
         self.event_type = event_type  # created, modified, deleted, moved
-        self.path = str(Path(path).resolve())
+        # Watchdog reports paths under the already-resolved watch root, so they
+        # are used as-is; resolving every event would cost a syscall each
+        self.path = path
+        # One split instead of separate basename()/dirname() calls per serialization
+        head, sep, self.filename = self.path.rpartition(os.sep)
+        self.parent_dir = head or sep
         self.is_directory = is_directory
-        self.src_path = str(Path(src_path).resolve()) if src_path else None
-        self.timestamp = timestamp or datetime.now()
+        self.src_path = src_path or None
+        # Events are created on the watchdog thread; keep that cheap by storing
+        # an integer clock reading and building the datetime only when needed
+        self._timestamp = timestamp
+        self.timestamp_ns = time.time_ns() if timestamp is None else None
+    
+    @property
+    def timestamp(self) -> datetime:
+        if self._timestamp is None:
+            seconds, ns = divmod(self.timestamp_ns, 1_000_000_000)
+            self._timestamp = datetime.fromtimestamp(seconds).replace(microsecond=ns // 1000)
+        return self._timestamp
+    
+    @property
+    def resolved_path(self) -> str:
+        """Canonical form of `path` (symlinks resolved), for consumers that need it."""
+        return _resolve_path(self.path)
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert event to dictionary for JSON serialization."""
+        """Convert event to dictionary for JSON serialization (orjson encodes the datetime)."""
         return {
             "event_type": self.event_type,
             "path": self.path,
             "is_directory": self.is_directory,
             "src_path": self.src_path,
-            "timestamp": self.timestamp.isoformat(),
-            "filename": os.path.basename(self.path),
-            "parent_dir": os.path.dirname(self.path)
+            "timestamp": self.timestamp,
+            "filename": self.filename,
+            "parent_dir": self.parent_dir
         }
 
 class AsyncFileEventHandler(FileSystemEventHandler):
@@ -46,7 +128,7 @@ class AsyncFileEventHandler(FileSystemEventHandler):
     
     def __init__(self, callback: Callable, filters: Dict[str, Any]):
         super().__init__()
-        self.callback = callback
+        self.callback = callback  # Plain callable, invoked on the event loop thread
         self.filters = filters
         self.loop = None
         self._setup_filters()
@@ -61,39 +143,69 @@ class AsyncFileEventHandler(FileSystemEventHandler):
         # Convert to absolute paths
         if self.specific_files:
             self.specific_files = {str(Path(f).resolve()) for f in self.specific_files}
+        
+        self._file_re = _compile_patterns(self.file_patterns)
+        self._exclude_re = _compile_patterns(self.exclude_patterns)
+        
+        # Editors emit several 'modified' events per save; repeats for the same
+        # path inside this window are coalesced into the last one, delivered
+        # when the window closes (0 disables debouncing)
+        self._debounce_s = self.filters.get('debounce_ms', 50) / 1000.0
+        # path -> [latest pending 'modified' event, its flush timer]; loop thread only
+        self._pending_modified: Dict[str, list] = {}
+    
+    def _dispatch(self, watcher_event: FileWatcherEvent):
+        """Deliver an event on the event loop thread, coalescing 'modified' bursts."""
+        if watcher_event.event_type == "modified" and self._debounce_s > 0:
+            pending = self._pending_modified.get(watcher_event.path)
+            if pending is None:
+                timer = self.loop.call_later(self._debounce_s, self._flush_modified, watcher_event.path)
+                self._pending_modified[watcher_event.path] = [watcher_event, timer]
+            else:
+                pending[0] = watcher_event
+            return
+        # Deliver a pending 'modified' first so events for a path stay in order
+        self._flush_modified(watcher_event.path)
+        if watcher_event.src_path:
+            self._flush_modified(watcher_event.src_path)
+        self.callback(watcher_event)
+    
+    def _flush_modified(self, path: str):
+        """Deliver the pending 'modified' event for path, if any."""
+        pending = self._pending_modified.pop(path, None)
+        if pending is not None:
+            pending[1].cancel()
+            self.callback(pending[0])
     
     def _should_process_event(self, event: FileSystemEvent) -> bool:
         """Determine if event should be processed based on filters."""
-        path = Path(event.src_path)
-        abs_path = str(path.resolve())
-        
         # Check if it's a directory and we're excluding directories
         if event.is_directory and not self.include_directories:
             return False
         
+        # watchdog reports absolute paths under the (resolved) watch root, so
+        # filtering works on the string; only specific_files needs resolving
+        src_path = os.path.normcase(event.src_path)
+        
         # Check specific files filter
-        if self.specific_files and abs_path not in self.specific_files:
+        if self.specific_files and _resolve_path(event.src_path) not in self.specific_files:
             return False
         
         # Check exclude patterns
-        filename = path.name
-        for pattern in self.exclude_patterns:
-            if fnmatch.fnmatch(filename, pattern) or fnmatch.fnmatch(abs_path, pattern):
-                return False
+        filename = os.path.basename(src_path)
+        if self._exclude_re is not None and (self._exclude_re.match(filename) or self._exclude_re.match(src_path)):
+            return False
         
         # Check include patterns (only if no specific files are specified)
         if not self.specific_files:
-            for pattern in self.file_patterns:
-                if fnmatch.fnmatch(filename, pattern):
-                    return True
-            return False  # No patterns matched
+            return self._file_re is not None and self._file_re.match(filename) is not None
         
         return True
     
     def _schedule_callback(self, watcher_event: FileWatcherEvent):
-        """Schedule callback in the event loop."""
+        """Hand the event to the callback on the event loop thread."""
         if self.loop and not self.loop.is_closed():
-            asyncio.run_coroutine_threadsafe(self.callback(watcher_event), self.loop)
+            self.loop.call_soon_threadsafe(self._dispatch, watcher_event)
     
     def on_created(self, event):
         if self._should_process_event(event):
@@ -123,6 +235,23 @@ class FileWatcherManager:
         self.observers: Dict[str, Observer] = {}
         self.event_callbacks: Dict[str, List[Callable]] = {}
         self._lock = threading.Lock()
+        # Observer threads push (watcher_id, event) here; one task drains it
+        self._event_queue: Optional[asyncio.Queue] = None
+        self._event_pump: Optional[asyncio.Task] = None
+    
+    def _ensure_event_pump(self) -> asyncio.Queue:
+        """Start the event-draining task on the running loop if it isn't running yet."""
+        loop = asyncio.get_running_loop()
+        if self._event_pump is None or self._event_pump.done() or self._event_pump.get_loop() is not loop:
+            self._event_queue = asyncio.Queue()
+            self._event_pump = loop.create_task(self._pump_events(self._event_queue))
+        return self._event_queue
+    
+    async def _pump_events(self, queue: asyncio.Queue):
+        """Dispatch queued file events to their watcher's callbacks, in arrival order."""
+        while True:
+            watcher_id, event = await queue.get()
+            await self._handle_file_event(watcher_id, event)
     
     async def create_watcher(self, watcher_id: str, watch_path: str, 
                            filters: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -141,17 +270,20 @@ class FileWatcherManager:
             if watcher_id in self.watchers:
                 raise ValueError(f"Watcher with ID '{watcher_id}' already exists")
             
-            # Setup event callback
-            async def event_callback(event: FileWatcherEvent):
-                await self._handle_file_event(watcher_id, event)
+            # Events are queued on the loop thread and dispatched by the pump task
+            queue = self._ensure_event_pump()
+            def event_callback(event: FileWatcherEvent):
+                queue.put_nowait((watcher_id, event))
             
             # Create event handler
             handler = AsyncFileEventHandler(event_callback, filters)
-            handler.loop = asyncio.get_event_loop()
+            handler.loop = asyncio.get_running_loop()
             
             # Create observer
             observer = Observer()
-            observer.schedule(handler, abs_path, recursive=filters.get('recursive', True))
+            for target, recursive in _watch_targets(abs_path, handler.specific_files,
+                                                    filters.get('recursive', True)):
+                observer.schedule(handler, target, recursive=recursive)
             
             # Store watcher info
             watcher_info = {
@@ -167,7 +299,7 @@ class FileWatcherManager:
             self.observers[watcher_id] = observer
             self.event_callbacks[watcher_id] = []
             
-            logger.info(f"Created file watcher '{watcher_id}' for path: {abs_path}")
+            logger.info("Created file watcher '%s' for path: %s", watcher_id, abs_path)
             return watcher_info
     
     async def start_watcher(self, watcher_id: str) -> Dict[str, Any]:
@@ -179,9 +311,10 @@ class FileWatcherManager:
             observer = self.observers[watcher_id]
             if not observer.is_alive():
                 observer.start()
+                _deprioritize_observer(observer)
                 self.watchers[watcher_id]['status'] = 'running'
                 self.watchers[watcher_id]['started'] = datetime.now()
-                logger.info(f"Started file watcher '{watcher_id}'")
+                logger.info("Started file watcher '%s'", watcher_id)
             
             return self.watchers[watcher_id]
     
@@ -191,15 +324,22 @@ class FileWatcherManager:
             if watcher_id not in self.watchers:
                 raise ValueError(f"Watcher '{watcher_id}' not found")
             
+            watcher_info = self.watchers[watcher_id]
             observer = self.observers[watcher_id]
-            if observer.is_alive():
-                observer.stop()
-                observer.join(timeout=5.0)
-                self.watchers[watcher_id]['status'] = 'stopped'
-                self.watchers[watcher_id]['stopped'] = datetime.now()
-                logger.info(f"Stopped file watcher '{watcher_id}'")
-            
-            return self.watchers[watcher_id]
+            if not observer.is_alive():
+                return watcher_info
+            watcher_info['status'] = 'stopping'
+        
+        # Join outside the lock (and off the event loop) so other watcher
+        # calls aren't blocked for up to the join timeout
+        observer.stop()
+        await asyncio.to_thread(observer.join, 5.0)
+        
+        with self._lock:
+            watcher_info['status'] = 'stopped'
+            watcher_info['stopped'] = datetime.now()
+        logger.info("Stopped file watcher '%s'", watcher_id)
+        return watcher_info
     
     async def remove_watcher(self, watcher_id: str) -> bool:
         """Remove a file watcher."""
@@ -218,7 +358,7 @@ class FileWatcherManager:
             if watcher_id in self.event_callbacks:
                 del self.event_callbacks[watcher_id]
         
-        logger.info(f"Removed file watcher '{watcher_id}'")
+        logger.info("Removed file watcher '%s'", watcher_id)
         return True
     
     async def list_watchers(self) -> List[Dict[str, Any]]:
@@ -239,7 +379,14 @@ class FileWatcherManager:
             return watcher_info
     
     def add_event_callback(self, watcher_id: str, callback: Callable):
-        """Add an event callback for a specific watcher."""
+        """Add an event callback (sync or async) for a specific watcher."""
+        # Normalize to a coroutine function once, instead of checking per event
+        if not asyncio.iscoroutinefunction(callback):
+            sync_callback = callback
+            @functools.wraps(sync_callback)
+            async def callback(event: FileWatcherEvent):
+                sync_callback(event)
+        
         with self._lock:
             if watcher_id in self.event_callbacks:
                 self.event_callbacks[watcher_id].append(callback)
@@ -247,37 +394,56 @@ class FileWatcherManager:
     def remove_event_callback(self, watcher_id: str, callback: Callable):
         """Remove an event callback for a specific watcher."""
         with self._lock:
-            if watcher_id in self.event_callbacks:
-                try:
-                    self.event_callbacks[watcher_id].remove(callback)
-                except ValueError:
-                    pass
+            callbacks = self.event_callbacks.get(watcher_id)
+            if callbacks:
+                callbacks[:] = [cb for cb in callbacks
+                                if cb is not callback and getattr(cb, '__wrapped__', None) is not callback]
     
     async def _handle_file_event(self, watcher_id: str, event: FileWatcherEvent):
         """Handle file system events."""
-        with self._lock:
-            if watcher_id in self.watchers:
-                self.watchers[watcher_id]['event_count'] += 1
-                self.watchers[watcher_id]['last_event'] = datetime.now()
+        # Runs only on the event loop thread (via the pump task), as do all other
+        # watcher-info updates, so the counters need no cross-thread lock
+        watcher_info = self.watchers.get(watcher_id)
+        if watcher_info is not None:
+            watcher_info['event_count'] += 1
+            watcher_info['last_event'] = event.timestamp  # Same datetime the SSE payload reuses
         
-        logger.debug(f"File event in watcher '{watcher_id}': {event.event_type} - {event.path}")
+        logger.debug("File event in watcher '%s': %s - %s", watcher_id, event.event_type, event.path)
         
-        # Call registered callbacks
-        callbacks = self.event_callbacks.get(watcher_id, [])
-        for callback in callbacks:
+        # Call registered callbacks (all coroutine functions, see add_event_callback)
+        callbacks = self.event_callbacks.get(watcher_id)
+        if not callbacks:
+            return
+        if len(callbacks) == 1:
+            # Common case: just the SSE broadcaster
             try:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(event)
-                else:
-                    callback(event)
+                await callbacks[0](event)
             except Exception as e:
-                logger.error(f"Error in file watcher callback: {e}")
+                logger.error("Error in file watcher callback: %s", e)
+            return
+        results = await asyncio.gather(*(callback(event) for callback in callbacks), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Error in file watcher callback: %s", result)
     
     async def cleanup_all(self):
         """Stop and remove all watchers."""
-        watcher_ids = list(self.watchers.keys())
-        for watcher_id in watcher_ids:
-            await self.remove_watcher(watcher_id)
+        with self._lock:
+            watcher_ids = list(self.watchers.keys())
+            observers = [o for o in self.observers.values() if o.is_alive()]
+        
+        # Signal every observer first, then wait for them together (off the
+        # event loop) instead of stopping and joining them one at a time
+        for observer in observers:
+            observer.stop()
+        await asyncio.gather(*(asyncio.to_thread(o.join, 5.0) for o in observers))
+        
+        await asyncio.gather(*(self.remove_watcher(w) for w in watcher_ids))
+        
+        pump, self._event_pump = self._event_pump, None
+        if pump is not None and pump.get_loop() is asyncio.get_running_loop():
+            pump.cancel()
+            await asyncio.gather(pump, return_exceptions=True)
 
 # Global instance
 file_watcher_manager = FileWatcherManager()
@@ -288,14 +454,16 @@ async def create_file_watcher(watcher_id: str, watch_path: str,
                             exclude_patterns: List[str] = None,
                             specific_files: List[str] = None,
                             recursive: bool = True,
-                            include_directories: bool = True) -> Dict[str, Any]:
+                            include_directories: bool = True,
+                            debounce_ms: int = 50) -> Dict[str, Any]:
     """Create a new file watcher with specified parameters."""
     filters = {
         'file_patterns': file_patterns or ['*'],
         'exclude_patterns': exclude_patterns or [],
         'specific_files': specific_files or [],
         'recursive': recursive,
-        'include_directories': include_directories
+        'include_directories': include_directories,
+        'debounce_ms': debounce_ms
     }
     
     return await file_watcher_manager.create_watcher(watcher_id, watch_path, filters)
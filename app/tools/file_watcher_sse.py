@@ -5,9 +5,10 @@ This module provides SSE capabilities for real-time file change notifications
 through MCP's streaming capabilities.
 """
 import asyncio
-import json
 import logging
-from typing import Dict, Any, AsyncGenerator, Set
+import orjson
+from collections import deque
+from typing import Dict, Any, AsyncGenerator, FrozenSet, Iterator, Optional, Set, Tuple
 from datetime import datetime
 from fastapi import Request
 from fastapi.responses import StreamingResponse
@@ -15,88 +16,132 @@ from app.tools.file_watcher import file_watcher_manager, FileWatcherEvent
 
 logger = logging.getLogger(__name__)
 
+# Per-client backlog bound; only a client this far behind has its oldest events dropped
+_CLIENT_QUEUE_SIZE = 1024
+
+def _frame(message: Dict[str, Any]) -> bytes:
+    """Encode a message as an SSE data frame."""
+    return b"data: " + orjson.dumps(message) + b"\n\n"
+
+class _ClientChannel:
+    """Pending frames for one SSE connection plus the signal that wakes its stream."""
+    __slots__ = ("pending", "ready")
+
+    def __init__(self):
+        self.pending: deque = deque(maxlen=_CLIENT_QUEUE_SIZE)
+        self.ready = asyncio.Event()
+
+    def take_all(self) -> list:
+        """Remove and return every pending frame, resetting the signal."""
+        frames = list(self.pending)
+        self.pending.clear()
+        self.ready.clear()
+        return frames
+
 class SSEFileWatcherNotifier:
     """Manages SSE connections for file watcher notifications."""
     
     def __init__(self):
-        self.active_connections: Dict[str, Set[asyncio.Queue]] = {}
+        self.active_connections: Dict[str, Set[_ClientChannel]] = {}
         self.client_watchers: Dict[str, Set[str]] = {}  # client_id -> watcher_ids
         self._lock = asyncio.Lock()
+        self.dropped_events = 0  # Events discarded because a client backlog was full
+        # Immutable view of the subscriptions, republished under the lock on every
+        # add/remove so broadcasts can iterate it without taking the lock
+        self._subscribers: Tuple[Tuple[str, Tuple[_ClientChannel, ...], FrozenSet[str]], ...] = ()
+    
+    def _publish_snapshot(self):
+        """Rebuild the subscription snapshot; call with self._lock held."""
+        self._subscribers = tuple(
+            (client_id, tuple(channels), frozenset(self.client_watchers.get(client_id, ())))
+            for client_id, channels in self.active_connections.items()
+        )
+    
+    def _subscribed_channels(self, watcher_id: str) -> Iterator[Tuple[str, _ClientChannel]]:
+        """Yield (client_id, channel) for every client subscribed to watcher_id."""
+        for client_id, channels, watchers in self._subscribers:
+            # An empty watcher set means the client follows all watchers
+            if not watchers or watcher_id in watchers:
+                for channel in channels:
+                    yield client_id, channel
+    
+    def _enqueue(self, client_id: str, channel: _ClientChannel, message: bytes):
+        """Append an encoded frame for a client and wake its stream."""
+        pending = channel.pending
+        if len(pending) == pending.maxlen:
+            # The deque discards the oldest frame on append
+            self.dropped_events += 1
+            logger.warning("Backlog full for client '%s', dropped oldest message (%d dropped in total)",
+                           client_id, self.dropped_events)
+        pending.append(message)
+        channel.ready.set()
     
-    async def add_client(self, client_id: str, watcher_ids: list = None) -> asyncio.Queue:
+    async def add_client(self, client_id: str, watcher_ids: list = None) -> _ClientChannel:
         """Add a new SSE client for file watcher notifications."""
         async with self._lock:
             if client_id not in self.active_connections:
                 self.active_connections[client_id] = set()
                 self.client_watchers[client_id] = set(watcher_ids or [])
             
-            # Create message queue for this client
-            queue = asyncio.Queue(maxsize=100)  # Limit queue size
-            self.active_connections[client_id].add(queue)
+            # Create the pending-frame channel for this connection
+            channel = _ClientChannel()
+            self.active_connections[client_id].add(channel)
+            self._publish_snapshot()
             
-            logger.info(f"Added SSE client '{client_id}' for watchers: {watcher_ids}")
-            return queue
+            logger.info("Added SSE client '%s' for watchers: %s", client_id, watcher_ids)
+            return channel
     
-    async def remove_client(self, client_id: str, queue: asyncio.Queue):
+    async def remove_client(self, client_id: str, channel: _ClientChannel):
         """Remove an SSE client."""
         async with self._lock:
             if client_id in self.active_connections:
-                self.active_connections[client_id].discard(queue)
+                self.active_connections[client_id].discard(channel)
                 if not self.active_connections[client_id]:
                     del self.active_connections[client_id]
                     if client_id in self.client_watchers:
                         del self.client_watchers[client_id]
+                self._publish_snapshot()
             
-            logger.info(f"Removed SSE client '{client_id}'")
+            logger.info("Removed SSE client '%s'", client_id)
     
     async def broadcast_event(self, watcher_id: str, event: FileWatcherEvent):
         """Broadcast file watcher event to subscribed SSE clients."""
-        message = {
+        # Encoded once and shared by every subscribed client
+        message = _frame({
             "type": "file_change",
             "watcher_id": watcher_id,
             "event": event.to_dict(),
-            "timestamp": datetime.now().isoformat()
-        }
+            "timestamp": datetime.now()
+        })
         
-        dead_queues = []
+        dead_channels = []
         
-        async with self._lock:
-            for client_id, queues in self.active_connections.items():
-                # Check if client is subscribed to this watcher
-                if not self.client_watchers.get(client_id) or watcher_id in self.client_watchers[client_id]:
-                    for queue in queues:
-                        try:
-                            queue.put_nowait(message)
-                        except asyncio.QueueFull:
-                            logger.warning(f"Queue full for client '{client_id}', dropping message")
-                        except Exception as e:
-                            logger.error(f"Error queuing message for client '{client_id}': {e}")
-                            dead_queues.append((client_id, queue))
+        for client_id, channel in self._subscribed_channels(watcher_id):
+            try:
+                self._enqueue(client_id, channel, message)
+            except Exception as e:
+                logger.error("Error queuing message for client '%s': %s", client_id, e)
+                dead_channels.append((client_id, channel))
         
-        # Clean up dead queues
-        for client_id, queue in dead_queues:
-            await self.remove_client(client_id, queue)
+        # Clean up dead channels
+        for client_id, channel in dead_channels:
+            await self.remove_client(client_id, channel)
     
     async def send_status_update(self, watcher_id: str, status: str, details: Dict[str, Any] = None):
         """Send status update to SSE clients."""
-        message = {
+        message = _frame({
             "type": "watcher_status",
             "watcher_id": watcher_id,
             "status": status,
             "details": details or {},
-            "timestamp": datetime.now().isoformat()
-        }
+            "timestamp": datetime.now()
+        })
         
-        async with self._lock:
-            for client_id, queues in self.active_connections.items():
-                if not self.client_watchers.get(client_id) or watcher_id in self.client_watchers[client_id]:
-                    for queue in queues:
-                        try:
-                            queue.put_nowait(message)
-                        except asyncio.QueueFull:
-                            logger.warning(f"Queue full for client '{client_id}', dropping status message")
-                        except Exception:
-                            pass
+        for client_id, channel in self._subscribed_channels(watcher_id):
+            try:
+                self._enqueue(client_id, channel, message)
+            except Exception:
+                pass
 
 # Global SSE notifier
 sse_notifier = SSEFileWatcherNotifier()
@@ -108,41 +153,71 @@ async def setup_watcher_sse_callback(watcher_id: str):
     
     file_watcher_manager.add_event_callback(watcher_id, sse_callback)
 
-async def file_watcher_sse_stream(client_id: str, watcher_ids: list = None) -> AsyncGenerator[str, None]:
-    """Generate SSE stream for file watcher events."""
-    queue = await sse_notifier.add_client(client_id, watcher_ids)
+# After waking, a stream waits this long so events arriving together are sent together
+_BATCH_WINDOW = 0.010
+
+# Idle streams get an SSE comment every _KEEPALIVE_INTERVAL seconds so proxies
+# don't time them out; clients ignore comments. The JSON heartbeat event is
+# still sent after _HEARTBEAT_INTERVAL seconds without any message.
+_KEEPALIVE_INTERVAL = 15.0
+_HEARTBEAT_INTERVAL = 30.0
+_KEEPALIVE_FRAME = b": keep-alive\n\n"
+
+async def file_watcher_sse_stream(client_id: str, watcher_ids: list = None,
+                                  request: Optional[Request] = None) -> AsyncGenerator[bytes, None]:
+    """Generate SSE stream for file watcher events.
+
+    If `request` is given, the stream also ends when the client is found to
+    have disconnected while idle, releasing its channel without waiting for a
+    failed write.
+    """
+    channel = await sse_notifier.add_client(client_id, watcher_ids)
+    loop = asyncio.get_running_loop()
     
     try:
         # Send initial connection message
-        yield f"data: {json.dumps({'type': 'connected', 'client_id': client_id, 'timestamp': datetime.now().isoformat()})}\n\n"
+        yield _frame({'type': 'connected', 'client_id': client_id, 'timestamp': datetime.now()})
+        last_sent = loop.time()
         
         while True:
             try:
-                # Wait for message with timeout
-                message = await asyncio.wait_for(queue.get(), timeout=30.0)
-                yield f"data: {json.dumps(message)}\n\n"
+                # Wait for pending messages with timeout
+                await asyncio.wait_for(channel.ready.wait(), timeout=_KEEPALIVE_INTERVAL)
+                await asyncio.sleep(_BATCH_WINDOW)
+                # One chunk per wake-up; each event stays its own SSE frame for clients
+                yield b"".join(channel.take_all())
+                last_sent = loop.time()
             except asyncio.TimeoutError:
+                if request is not None and await request.is_disconnected():
+                    logger.info("SSE client '%s' disconnected", client_id)
+                    break
+                if loop.time() - last_sent < _HEARTBEAT_INTERVAL:
+                    yield _KEEPALIVE_FRAME
+                    continue
                 # Send heartbeat to keep connection alive
-                yield f"data: {json.dumps({'type': 'heartbeat', 'timestamp': datetime.now().isoformat()})}\n\n"
+                yield _frame({'type': 'heartbeat', 'timestamp': datetime.now()})
+                last_sent = loop.time()
             except Exception as e:
-                logger.error(f"Error in SSE stream for client '{client_id}': {e}")
+                logger.error("Error in SSE stream for client '%s': %s", client_id, e)
                 break
     
     except Exception as e:
-        logger.error(f"Error in file watcher SSE stream: {e}")
+        logger.error("Error in file watcher SSE stream: %s", e)
     
     finally:
-        await sse_notifier.remove_client(client_id, queue)
+        await sse_notifier.remove_client(client_id, channel)
+
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Stop reverse proxies (nginx) from buffering the stream
+}
 
-def create_sse_response(client_id: str, watcher_ids: list = None) -> StreamingResponse:
+def create_sse_response(client_id: str, watcher_ids: list = None,
+                        request: Optional[Request] = None) -> StreamingResponse:
     """Create an SSE streaming response for file watcher events."""
     return StreamingResponse(
-        file_watcher_sse_stream(client_id, watcher_ids),
+        file_watcher_sse_stream(client_id, watcher_ids, request),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control",
-        }
+        headers=_SSE_HEADERS
     )
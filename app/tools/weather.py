@@ -1,38 +1,50 @@
 import httpx
 import logging
+import time
+import orjson
+from app.config.config import settings
+from app.core.async_cache import AsyncTTLCache
+from app.core.http_client import get_with_retries, response_excerpt
 
 logger = logging.getLogger(__name__)
 
+# Error results are not cached so a transient failure is retried on the next call
+_weather_cache = AsyncTTLCache(ttl=settings.WEATHER_CACHE_TTL,
+                               cache_if=lambda result: "error" not in result)
+
+@_weather_cache.cached(key=lambda location: location.strip().lower())
 async def get_weather(location: str): # Changed params: dict to location: str for clarity with FastMCP tool definition
-    logger.info(f"Weather request received for location: '{location}'")
+    logger.debug("Weather request received for location: %r", location)
 
     if not location:
         logger.warning("Location parameter is missing for weather request.")
         return {"error": "Location parameter is required"}
     
     api_url = f"https://wttr.in/{location}?format=j1"
-    logger.info(f"Requesting weather data from URL: {api_url}")
+    logger.debug("Requesting weather data from URL: %s", api_url)
     
     response_obj = None # Initialize in case request fails early
+    start = time.perf_counter()
     try:
-        response_obj = httpx.get(api_url)
-        logger.info(f"Response status code for {location}: {response_obj.status_code}")
+        response_obj = await get_with_retries(api_url)
+        logger.debug("Response status code for %s: %d", location, response_obj.status_code)
         response_obj.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
         
-        weather_data = response_obj.json()
-        logger.info(f"Successfully decoded JSON response for {location}.")
-        logger.debug(f"Weather data for {location}: {weather_data}") # Added debug log for full response
+        weather_data = orjson.loads(response_obj.content)
+        logger.info("Weather for %r fetched in %.1fms", location, (time.perf_counter() - start) * 1000)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Weather data for %s: %s", location, weather_data)
         return weather_data
     except httpx.HTTPStatusError as http_err:
-        logger.error(f"HTTP error for {location}: {http_err}")
-        if response_obj is not None:
-            logger.debug(f"HTTPStatusError response content for {location}: {response_obj.text}")
+        logger.error("HTTP error for %s: %s", location, http_err)
+        if response_obj is not None and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("HTTPStatusError response content for %s: %s", location, response_excerpt(response_obj))
         return {"error": f"HTTP error occurred: {http_err} - Check if the location is valid."}
     except httpx.RequestError as req_err:
-        logger.error(f"Request error for {location}: {req_err}")
+        logger.error("Request error for %s: %s", location, req_err)
         return {"error": f"Request error occurred: {req_err}"}
-    except ValueError as json_err: # More specific for JSON decoding errors
-        logger.error(f"JSON decoding error for {location}: {json_err}")
-        if response_obj is not None:
-            logger.debug(f"Content that failed JSON decoding for {location}: {response_obj.text}")
+    except orjson.JSONDecodeError as json_err: # More specific for JSON decoding errors
+        logger.error("JSON decoding error for %s: %s", location, json_err)
+        if response_obj is not None and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Content that failed JSON decoding for %s: %s", location, response_excerpt(response_obj))
         return {"error": "Failed to decode JSON response from weather service."}
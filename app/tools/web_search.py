@@ -1,15 +1,64 @@
 import logging
-import httpx  # Using httpx for async requests
+import time
+import orjson
+from collections import OrderedDict
+import httpx  # Exception types; requests go through the shared client
 from app.config.config import settings
-from typing import List, Optional
+from app.core.async_cache import AsyncTTLCache
+from app.core.concurrency import RateLimiter, resizable_limiter
+from app.core.http_client import get_with_retries, response_excerpt
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 # Note: logging.basicConfig is removed as it's handled in config.py
 
+_BRAVE_SEARCH_URL = "https://api.search.brave.com/res/v1/web/search"
+_GOOGLE_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+# Google rejects longer queries with a 400, so they are refused before the request
+_GOOGLE_MAX_QUERY_LENGTH = 2048
+
+# Settings are fixed for the life of the process, so the headers are built once;
+# they are passed per request rather than set on the shared client, which also
+# talks to other hosts
+_BRAVE_HEADERS = {
+    "Accept": "application/json",
+    "X-Subscription-Token": settings.BRAVE_API_KEY
+}
+
+# Per-engine limits so one busy engine neither floods its API nor trips its quota
+_brave_limiter = resizable_limiter("BRAVE_MAX_CONCURRENT")
+_brave_rate = RateLimiter(settings.BRAVE_QPS)
+_google_limiter = resizable_limiter("GOOGLE_MAX_CONCURRENT")
+_google_rate = RateLimiter(settings.GOOGLE_QPS)
+
+# Error results are not cached so a transient failure is retried on the next call
+_search_cache = AsyncTTLCache(ttl=settings.SEARCH_CACHE_TTL,
+                              cache_if=lambda result: "error" not in result)
+
+# Last ETag and result per upstream request, kept past the cache TTL so an
+# expired search can be revalidated with If-None-Match instead of re-downloaded
+_validators: "OrderedDict[Tuple, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+_VALIDATORS_MAXSIZE = 1024
+
+def _remember_validator(key: Tuple, response_obj: httpx.Response, result: Dict[str, Any]):
+    """Store the response's ETag (if any) with the result it produced."""
+    etag = response_obj.headers.get("ETag")
+    if etag:
+        _validators[key] = (etag, result)
+        _validators.move_to_end(key)
+        if len(_validators) > _VALIDATORS_MAXSIZE:
+            _validators.popitem(last=False)
+
+def _search_key(engine: str):
+    def key(query: str, count: int = 10, sites: Optional[List[str]] = None):
+        return (engine, query, count, tuple(sorted(sites or ())))
+    return key
+
+@_search_cache.cached(key=_search_key("brave"))
 async def search_brave(query: str, count: int = 10, sites: Optional[List[str]] = None):
     """Search using Brave Search API. Optionally restrict to a list of sites."""
-    logger.info(f"Brave Search request for query: '{query}' with count: {count} and sites: {sites}")
+    logger.debug("Brave Search request: query=%r count=%d sites=%s", query, count, sites)
     
     if not query:
         logger.warning("Brave Search: Query parameter is missing.")
@@ -20,71 +69,79 @@ async def search_brave(query: str, count: int = 10, sites: Optional[List[str]] =
 
     # If sites are provided, add site restriction to the query
     if sites:
-        site_query = " OR ".join([f"site:{site}" for site in sites])
+        site_query = " OR ".join(f"site:{site}" for site in sites)
         query = f"{query} {site_query}"
 
-    # Use proper URL encoding and count parameter like TypeScript version
-    import urllib.parse
-    encoded_query = urllib.parse.quote_plus(query)  # Use quote_plus for better compatibility
-    api_url = f"https://api.search.brave.com/res/v1/web/search?q={encoded_query}&count={count}"
-    
-    headers = {
-        "Accept": "application/json",
-        "X-Subscription-Token": settings.BRAVE_API_KEY
-    }
+    # httpx encodes the query parameters
+    params = {"q": query, "count": count}
     
-    logger.info(f"Brave Search: Requesting URL: {api_url}")
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response_obj = await client.get(api_url, headers=headers)
-            logger.info(f"Brave Search: Response status for '{query}': {response_obj.status_code}")
-            
-            if not response_obj.is_success:
-                error_text = response_obj.text
-                logger.error(f"Brave Search: HTTP error! status: {response_obj.status_code}, response: {error_text}")
-                return {"error": f"HTTP error! status: {response_obj.status_code}, details: {error_text}"}
-            
-            data = response_obj.json()
-            logger.info(f"Brave Search: Successfully decoded JSON for '{query}'.")
-            
-            # Process results like TypeScript version - extract web results
-            web_results = data.get('web', {}).get('results', [])
-            
-            # Transform to consistent format
-            search_results = []
-            for result in web_results:
-                search_results.append({
-                    "title": result.get("title", ""),
-                    "url": result.get("url", ""),
-                    "description": result.get("description", "")
-                })
-            
-            logger.info(f"Brave Search: Found {len(search_results)} results for '{query}'")
-            logger.debug(f"Brave Search processed results for '{query}': {search_results}")
-            
-            return {
-                "query": query,
-                "results": search_results,
-                "total_results": len(search_results)
+    logger.debug("Brave Search: Requesting %s with params: %s", _BRAVE_SEARCH_URL, params)
+
+    validator_key = ("brave", query, count)
+    validator = _validators.get(validator_key)
+    headers = _BRAVE_HEADERS if validator is None else {**_BRAVE_HEADERS, "If-None-Match": validator[0]}
+
+    start = time.perf_counter()
+    try:
+        response_obj = await get_with_retries(_BRAVE_SEARCH_URL, limiter=_brave_limiter, rate=_brave_rate,
+                                              params=params, headers=headers)
+        logger.debug("Brave Search: Response status for %r: %d", query, response_obj.status_code)
+        
+        if response_obj.status_code == 304 and validator is not None:
+            logger.info("Brave Search: results for %r not modified in %.1fms",
+                        query, (time.perf_counter() - start) * 1000)
+            return validator[1]
+        
+        if not response_obj.is_success:
+            error_text = response_excerpt(response_obj)
+            logger.error("Brave Search: HTTP error! status: %d, response: %s", response_obj.status_code, error_text)
+            return {"error": f"HTTP error! status: {response_obj.status_code}, details: {error_text}"}
+        
+        data = orjson.loads(response_obj.content)
+        
+        # Process results like TypeScript version - extract web results
+        web_results = data.get('web', {}).get('results', ())
+        
+        # Transform to consistent format
+        search_results = [
+            {
+                "title": result.get("title", ""),
+                "url": result.get("url", ""),
+                "description": result.get("description", "")
             }
-            
-        except httpx.HTTPStatusError as http_err:
-            logger.error(f"Brave Search: HTTP error for '{query}': {http_err}")
-            return {"error": f"Brave Search HTTP error: {http_err}"}
-        except httpx.RequestError as req_err:
-            logger.error(f"Brave Search: Request error for '{query}': {req_err}")
-            return {"error": f"Brave Search request error: {req_err}"}
-        except ValueError as json_err:
-            logger.error(f"Brave Search: JSON decoding error for '{query}': {json_err}")
-            return {"error": "Brave Search: Failed to decode JSON response."}
-        except Exception as e:
-            logger.error(f"Brave Search: Unexpected error for '{query}': {e}")
-            return {"error": f"Brave Search unexpected error: {e}"}
+            for result in web_results
+        ]
+        
+        logger.info("Brave Search: %d results for %r in %.1fms",
+                    len(search_results), query, (time.perf_counter() - start) * 1000)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Brave Search processed results for %r: %s", query, search_results)
+        
+        result = {
+            "query": query,
+            "results": search_results,
+            "total_results": len(search_results)
+        }
+        _remember_validator(validator_key, response_obj, result)
+        return result
+        
+    except httpx.HTTPStatusError as http_err:
+        logger.error("Brave Search: HTTP error for %r: %s", query, http_err)
+        return {"error": f"Brave Search HTTP error: {http_err}"}
+    except httpx.RequestError as req_err:
+        logger.error("Brave Search: Request error for %r: %s", query, req_err)
+        return {"error": f"Brave Search request error: {req_err}"}
+    except orjson.JSONDecodeError as json_err:
+        logger.error("Brave Search: JSON decoding error for %r: %s", query, json_err)
+        return {"error": "Brave Search: Failed to decode JSON response."}
+    except Exception as e:
+        logger.error("Brave Search: Unexpected error for %r: %s", query, e)
+        return {"error": f"Brave Search unexpected error: {e}"}
 
+@_search_cache.cached(key=_search_key("google"))
 async def search_google(query: str, count: int = 10, sites: Optional[List[str]] = None):
     """Search using Google Custom Search JSON API. Optionally restrict to a list of sites."""
-    logger.info(f"Google Search request for query: '{query}' with count: {count} and sites: {sites}")
+    logger.debug("Google Search request: query=%r count=%d sites=%s", query, count, sites)
     
     if not query:
         logger.warning("Google Search: Query parameter is missing.")
@@ -95,57 +152,70 @@ async def search_google(query: str, count: int = 10, sites: Optional[List[str]]
 
     # If sites are provided, add site restriction to the query
     if sites:
-        site_query = " OR ".join([f"site:{site}" for site in sites])
+        site_query = " OR ".join(f"site:{site}" for site in sites)
         query = f"{query} {site_query}"
+    if len(query) > _GOOGLE_MAX_QUERY_LENGTH:
+        logger.warning("Google Search: Query is %d characters long (limit %d), not sending it.",
+                       len(query), _GOOGLE_MAX_QUERY_LENGTH)
+        return {"error": f"Query including site filters exceeds {_GOOGLE_MAX_QUERY_LENGTH} characters; use fewer sites"}
+
+    # httpx encodes the query parameters; the API key is kept out of the log line
+    params = {"cx": settings.GOOGLE_CSE_ID, "q": query, "num": count}
+    logger.debug("Google Search: Requesting %s with params: %s", _GOOGLE_SEARCH_URL, params)
+
+    validator_key = ("google", query, count)
+    validator = _validators.get(validator_key)
+    headers = None if validator is None else {"If-None-Match": validator[0]}
 
-    # Proper URL encoding for the query
-    import urllib.parse
-    encoded_query = urllib.parse.quote_plus(query)
-    api_url = (
-        f"https://www.googleapis.com/customsearch/v1?key={settings.GOOGLE_API_KEY}"
-        f"&cx={settings.GOOGLE_CSE_ID}&q={encoded_query}&num={count}"
-    )
-    logger.info(f"Google Search: Requesting URL: {api_url}")
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response_obj = await client.get(api_url)
-            logger.info(f"Google Search: Response status for '{query}': {response_obj.status_code}")
-            
-            if not response_obj.is_success:
-                error_text = response_obj.text
-                logger.error(f"Google Search: HTTP error! status: {response_obj.status_code}, response: {error_text}")
-                return {"error": f"HTTP error! status: {response_obj.status_code}, details: {error_text}"}
-            
-            data = response_obj.json()
-            logger.info(f"Google Search: Successfully decoded JSON for '{query}'.")
-            
-            items = data.get('items', [])
-            search_results = []
-            for item in items:
-                search_results.append({
-                    "title": item.get("title", ""),
-                    "url": item.get("link", ""),
-                    "description": item.get("snippet", "")
-                })
-            
-            logger.info(f"Google Search: Found {len(search_results)} results for '{query}'")
-            logger.debug(f"Google Search processed results for '{query}': {search_results}")
-            
-            return {
-                "query": query,
-                "results": search_results,
-                "total_results": len(search_results)
+    start = time.perf_counter()
+    try:
+        response_obj = await get_with_retries(_GOOGLE_SEARCH_URL, limiter=_google_limiter, rate=_google_rate,
+                                              params={"key": settings.GOOGLE_API_KEY, **params}, headers=headers)
+        logger.debug("Google Search: Response status for %r: %d", query, response_obj.status_code)
+        
+        if response_obj.status_code == 304 and validator is not None:
+            logger.info("Google Search: results for %r not modified in %.1fms",
+                        query, (time.perf_counter() - start) * 1000)
+            return validator[1]
+        
+        if not response_obj.is_success:
+            error_text = response_excerpt(response_obj)
+            logger.error("Google Search: HTTP error! status: %d, response: %s", response_obj.status_code, error_text)
+            return {"error": f"HTTP error! status: {response_obj.status_code}, details: {error_text}"}
+        
+        data = orjson.loads(response_obj.content)
+        
+        items = data.get('items', ())
+        search_results = [
+            {
+                "title": item.get("title", ""),
+                "url": item.get("link", ""),
+                "description": item.get("snippet", "")
             }
-        except httpx.HTTPStatusError as http_err:
-            logger.error(f"Google Search: HTTP error for '{query}': {http_err}")
-            return {"error": f"Google Search HTTP error: {http_err}"}
-        except httpx.RequestError as req_err:
-            logger.error(f"Google Search: Request error for '{query}': {req_err}")
-            return {"error": f"Google Search request error: {req_err}"}
-        except ValueError as json_err:
-            logger.error(f"Google Search: JSON decoding error for '{query}': {json_err}")
-            return {"error": "Google Search: Failed to decode JSON response."}
-        except Exception as e:
-            logger.error(f"Google Search: Unexpected error for '{query}': {e}")
-            return {"error": f"Google Search unexpected error: {e}"}
+            for item in items
+        ]
+        
+        logger.info("Google Search: %d results for %r in %.1fms",
+                    len(search_results), query, (time.perf_counter() - start) * 1000)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Google Search processed results for %r: %s", query, search_results)
+        
+        result = {
+            "query": query,
+            "results": search_results,
+            "total_results": len(search_results)
+        }
+        _remember_validator(validator_key, response_obj, result)
+        return result
+    except httpx.HTTPStatusError as http_err:
+        logger.error("Google Search: HTTP error for %r: %s", query, http_err)
+        return {"error": f"Google Search HTTP error: {http_err}"}
+    except httpx.RequestError as req_err:
+        logger.error("Google Search: Request error for %r: %s", query, req_err)
+        return {"error": f"Google Search request error: {req_err}"}
+    except orjson.JSONDecodeError as json_err:
+        logger.error("Google Search: JSON decoding error for %r: %s", query, json_err)
+        return {"error": "Google Search: Failed to decode JSON response."}
+    except Exception as e:
+        logger.error("Google Search: Unexpected error for %r: %s", query, e)
+        return {"error": f"Google Search unexpected error: {e}"}
@@ -1,15 +1,30 @@
 #!/usr/bin/env python
 import uvicorn
 from app.config import settings # Import settings
-import subprocess # For running main.py directly
+import os # For replacing this process with main.py
+import subprocess # For running main.py as a child on Windows
 import sys # For passing arguments
 
 if __name__ == "__main__":
     if settings.MCP_TRANSPORT_MODE == "stdio":
-        # Run app/main.py directly for stdio mode
+        # Run app.main directly for stdio mode
         # Pass any command line arguments from run.py to main.py
-        process = subprocess.Popen([sys.executable, "app/main.py"] + sys.argv[1:], stdin=sys.stdin, stdout=sys.stdout, stderr=sys.stderr)
-        process.wait()
+        main_cmd = [sys.executable, "-m", "app.main", *sys.argv[1:]]
+        if os.name == "nt":
+            # Windows has no real exec: os.execv starts a new process and exits
+            # this one, so the caller would lose the stdio pipe. Wait on a child.
+            sys.exit(subprocess.run(main_cmd).returncode)
+        # The current process becomes main.py (same PID and stdio, signals
+        # delivered directly) instead of idling in a parent that waits on a
+        # child interpreter.
+        os.execv(sys.executable, main_cmd)
     else:
         # Default to HTTP/SSE mode using Uvicorn
-        uvicorn.run("app.main:app", host=settings.MCP_SERVER_HOST, port=settings.MCP_SERVER_PORT, reload=True)
+        workers = settings.MCP_SERVER_WORKERS
+        if workers > 1:
+            # Multi-process serving (no auto-reload). File watchers and MCP
+            # sessions live in each worker's memory, so clients need sticky
+            # routing to the worker that created them.
+            uvicorn.run("app.main:app", host=settings.MCP_SERVER_HOST, port=settings.MCP_SERVER_PORT, workers=workers)
+        else:
+            uvicorn.run("app.main:app", host=settings.MCP_SERVER_HOST, port=settings.MCP_SERVER_PORT, reload=True)
@@ -1,90 +1,311 @@
 #!/usr/bin/env python3
 """
 Simple MCP client to test our server functionality
+
+Set MCP_DEBUG=1 to print the full traceback when the test fails.
 """
+import argparse
 import asyncio
+import contextlib
 import json
+import os
+import sys
+import time
+import traceback
+from typing import Final
+
+import httpx
 from mcp.client.streamable_http import streamablehttp_client
 from mcp import ClientSession
 
+SERVER_URL = "http://localhost:8001/mcp"
+
+# Tool calls made by the functional test, built once at import:
+# (heading, label, tool name, arguments, characters shown or None for all)
+TOOL_TESTS: Final = (
+    ("🔧 Testing weather tool...", "Weather tool",
+     "weather", {"location": "San Francisco, CA"}, None),
+    ("🔍 Testing Google search tool...", "Search tool",
+     "google_search_tool", {"query": "Joseph Benraz, Israel"}, 200),
+    ("🔍 Testing Brave search tool...", "Search tool",
+     "brave_search_tool", {"query": "MCP Model Context Protocol"}, 200),
+    ("🔍 Testing Google search tool with site restriction...", "Search tool (site-restricted)",
+     "google_search_tool", {
+         "query": "Joseph Benraz, Israel",
+         "sites": ["en.wikipedia.org", "timesofisrael.com", "linkedin.com", "x.com"]
+     }, 200),
+)
+
+class MCPProbe:
+    """An initialized MCP session kept open for any number of calls.
+
+    Entering the probe connects and runs the MCP handshake once; reuse the
+    same probe for repeated checks instead of reconnecting for each one.
+    """
+    
+    def __init__(self, server_url: str = SERVER_URL):
+        self.server_url = server_url
+        self.session = None
+        self._stack = None
+    
+    async def __aenter__(self) -> "MCPProbe":
+        stack = contextlib.AsyncExitStack()
+        try:
+            read_stream, write_stream, _ = await stack.enter_async_context(
+                streamablehttp_client(self.server_url))
+            self.session = await stack.enter_async_context(ClientSession(read_stream, write_stream))
+            await self.session.initialize()
+        except BaseException:
+            await stack.aclose()
+            raise
+        self._stack = stack
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.session = None
+        stack, self._stack = self._stack, None
+        return await stack.__aexit__(*exc_info)
+    
+    async def call(self, tool: str, arguments: dict = None):
+        """Call a tool on the open session (arguments are passed through, not copied)."""
+        return await self.session.call_tool(tool, arguments)
+
+async def list_all(list_page, field: str) -> list:
+    """Collect every page of a paginated MCP listing, e.g. list_all(session.list_tools, "tools")."""
+    page = await list_page()
+    items = list(getattr(page, field))
+    while page.nextCursor:
+        page = await list_page(cursor=page.nextCursor)
+        items.extend(getattr(page, field))
+    return items
+
+def print_listing(heading: str, kind: str, entries: list):
+    """Print a listing section (heading, count, one line per entry) in a single write."""
+    print("\n".join([heading, f"Found {len(entries)} {kind}:", *entries]))
+
+def print_tool_result(test: tuple, text: str = None, error: BaseException = None):
+    """Print the outcome of one TOOL_TESTS entry."""
+    heading, label, _, _, limit = test
+    print(f"\n{heading}")
+    if error is not None:
+        print(f"❌ {label} error: {error}")
+    elif limit is None:
+        print(f"✅ {label} result: {text}")
+    else:
+        print(f"✅ {label} result: {text[:limit]}...")
+
 async def test_mcp_server():
     """Test the MCP server functionality"""
-    server_url = "http://localhost:8001/mcp"
     
     try:
-        print(f"Connecting to MCP server at {server_url}...")
+        print(f"Connecting to MCP server at {SERVER_URL}...")
+        
+        # Connect using streamable HTTP client and initialize the session
+        print("Initializing MCP session...")
+        async with MCPProbe() as probe:
+            session = probe.session
+            print("✅ MCP session initialized successfully!")
+            
+            # Discover tools, resources and prompts concurrently (one round trip of latency);
+            # if one listing fails the task group cancels the others right away
+            async with asyncio.TaskGroup() as tg:
+                tools_task = tg.create_task(list_all(session.list_tools, "tools"))
+                resources_task = tg.create_task(list_all(session.list_resources, "resources"))
+                prompts_task = tg.create_task(list_all(session.list_prompts, "prompts"))
+            tools, resources, prompts = tools_task.result(), resources_task.result(), prompts_task.result()
+            
+            # List available tools
+            print_listing("\n📋 Listing available tools...", "tools",
+                          [f"  - {tool.name}: {tool.description}" for tool in tools])
+            
+            # Test calling the tools
+            if tools:
+                # The calls run concurrently; results are reported in the order above. gather
+                # with return_exceptions (not a TaskGroup) so one failing tool doesn't cancel the rest
+                results = await asyncio.gather(
+                    *(probe.call(name, arguments) for _, _, name, arguments, _ in TOOL_TESTS),
+                    return_exceptions=True
+                )
+                for test, result in zip(TOOL_TESTS, results):
+                    if isinstance(result, Exception):
+                        print_tool_result(test, error=result)
+                    else:
+                        print_tool_result(test, result.content[0].text if result.content else 'No content')
+            
+            # List available resources
+            print_listing("\n📚 Listing available resources...", "resources",
+                          [f"  - {resource.uri}: {resource.name}" for resource in resources])
+            
+            # List available prompts
+            print_listing("\n💬 Listing available prompts...", "prompts",
+                          [f"  - {prompt.name}: {prompt.description}" for prompt in prompts])
+            
+            print(f"\n🎉 All tests completed successfully!")
+            
+    except Exception as e:
+        print(f"❌ Error testing MCP server: {e}")
+        # Full stack only on request (MCP_DEBUG=1), so looped runs stay cheap and readable
+        if os.environ.get("MCP_DEBUG"):
+            traceback.print_exc()
+
+class SyncMCPClient:
+    """Minimal blocking JSON-RPC client for the streamable HTTP endpoint.
+
+    For one-shot checks with nothing to overlap, this skips the event loop
+    and the client session machinery entirely.
+    """
+    
+    def __init__(self, server_url: str = SERVER_URL):
+        self.server_url = server_url
+        self.client = httpx.Client(follow_redirects=True, timeout=30.0)
+        self.headers = {"Accept": "application/json, text/event-stream"}
+        self._next_id = 0
+    
+    def close(self):
+        """End the server-side session (as the async client does) and close the connection."""
+        try:
+            if "mcp-session-id" in self.headers:
+                self.client.delete(self.server_url, headers=self.headers)
+        except httpx.HTTPError:
+            pass
+        finally:
+            self.client.close()
+    
+    def notify(self, method: str, params: dict = None):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self.client.post(self.server_url, json=message, headers=self.headers).raise_for_status()
+    
+    def request(self, method: str, params: dict = None) -> dict:
+        """Send a request and return its result; JSON-RPC errors raise RuntimeError."""
+        self._next_id += 1
+        message = {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params or {}}
+        response = self.client.post(self.server_url, json=message, headers=self.headers)
+        response.raise_for_status()
+        if "mcp-session-id" in response.headers:
+            self.headers["mcp-session-id"] = response.headers["mcp-session-id"]
+        
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            # The reply arrives as an SSE "data:" line; skip any other events
+            replies = [json.loads(line[5:]) for line in response.text.splitlines() if line.startswith("data:")]
+            reply = next(r for r in replies if r.get("id") == self._next_id)
+        else:
+            reply = response.json()
+        if "error" in reply:
+            raise RuntimeError(reply["error"].get("message", reply["error"]))
+        return reply["result"]
+    
+    def initialize(self):
+        self.request("initialize", {
+            "protocolVersion": "2025-03-26",
+            "capabilities": {},
+            "clientInfo": {"name": "test_mcp_client", "version": "1.0"},
+        })
+        self.notify("notifications/initialized")
+    
+    def list_all(self, method: str, field: str) -> list:
+        """Collect every page of a paginated listing, e.g. list_all("tools/list", "tools")."""
+        result = self.request(method)
+        items = list(result.get(field, []))
+        while result.get("nextCursor"):
+            result = self.request(method, {"cursor": result["nextCursor"]})
+            items.extend(result.get(field, []))
+        return items
+
+def run_sync_smoke_test():
+    """Same checks as test_mcp_server, one blocking request at a time."""
+    print(f"Connecting to MCP server at {SERVER_URL} (sync)...")
+    client = SyncMCPClient()
+    try:
+        print("Initializing MCP session...")
+        client.initialize()
+        print("✅ MCP session initialized successfully!")
+        
+        tools = client.list_all("tools/list", "tools")
+        print_listing("\n📋 Listing available tools...", "tools",
+                      [f"  - {tool['name']}: {tool.get('description')}" for tool in tools])
+        
+        if tools:
+            for test in TOOL_TESTS:
+                _, _, name, arguments, _ = test
+                try:
+                    result = client.request("tools/call", {"name": name, "arguments": arguments})
+                except Exception as e:
+                    print_tool_result(test, error=e)
+                    continue
+                content = result.get("content")
+                print_tool_result(test, content[0].get("text") if content else 'No content')
         
-        # Connect using streamable HTTP client
-        async with streamablehttp_client(server_url) as (read_stream, write_stream, _):
-            async with ClientSession(read_stream, write_stream) as session:
-                # Initialize the connection
-                print("Initializing MCP session...")
-                await session.initialize()
-                print("✅ MCP session initialized successfully!")
-                
-                # List available tools
-                print("\n📋 Listing available tools...")
-                tools = await session.list_tools()
-                print(f"Found {len(tools.tools)} tools:")
-                for tool in tools.tools:
-                    print(f"  - {tool.name}: {tool.description}")
-                
-                # Test calling a tool (weather)
-                if tools.tools:
-                    print(f"\n🔧 Testing weather tool...")
-                    try:
-                        result = await session.call_tool("weather", {"location": "San Francisco, CA"})
-                        print(f"✅ Weather tool result: {result.content[0].text if result.content else 'No content'}")
-                    except Exception as e:
-                        print(f"❌ Weather tool error: {e}")
-                    
-                    # Test search tool
-                    print(f"\n🔍 Testing Google search tool...")
-                    try:
-                        result = await session.call_tool("google_search_tool", {"query": "Joseph Benraz, Israel"})
-                        print(f"✅ Search tool result: {result.content[0].text[:200] if result.content else 'No content'}...")
-                    except Exception as e:
-                        print(f"❌ Search tool error: {e}")
-                    
-                    # Test search tool
-                    print(f"\n🔍 Testing Brave search tool...")
-                    try:
-                        result = await session.call_tool("brave_search_tool", {"query": "MCP Model Context Protocol"})
-                        print(f"✅ Search tool result: {result.content[0].text[:200] if result.content else 'No content'}...")
-                    except Exception as e:
-                        print(f"❌ Search tool error: {e}")
-                    
-                    # Test Google search tool with site restriction
-                    print(f"\n🔍 Testing Google search tool with site restriction...")
-                    try:
-                        result = await session.call_tool("google_search_tool", {
-                            "query": "Joseph Benraz, Israel",
-                            "sites": ["en.wikipedia.org", "timesofisrael.com", "linkedin.com", "x.com"]
-                        })
-                        print(f"✅ Search tool (site-restricted) result: {result.content[0].text[:200] if result.content else 'No content'}...")
-                    except Exception as e:
-                        print(f"❌ Search tool (site-restricted) error: {e}")
-                
-                # List available resources
-                print(f"\n📚 Listing available resources...")
-                resources = await session.list_resources()
-                print(f"Found {len(resources.resources)} resources:")
-                for resource in resources.resources:
-                    print(f"  - {resource.uri}: {resource.name}")
-                
-                # List available prompts
-                print(f"\n💬 Listing available prompts...")
-                prompts = await session.list_prompts()
-                print(f"Found {len(prompts.prompts)} prompts:")
-                for prompt in prompts.prompts:
-                    print(f"  - {prompt.name}: {prompt.description}")
-                
-                print(f"\n🎉 All tests completed successfully!")
-                
+        resources = client.list_all("resources/list", "resources")
+        print_listing("\n📚 Listing available resources...", "resources",
+                      [f"  - {resource['uri']}: {resource.get('name')}" for resource in resources])
+        
+        prompts = client.list_all("prompts/list", "prompts")
+        print_listing("\n💬 Listing available prompts...", "prompts",
+                      [f"  - {prompt['name']}: {prompt.get('description')}" for prompt in prompts])
+        
+        print("\n🎉 All tests completed successfully!")
+    
     except Exception as e:
         print(f"❌ Error testing MCP server: {e}")
-        import traceback
-        traceback.print_exc()
+        if os.environ.get("MCP_DEBUG"):
+            traceback.print_exc()
+    finally:
+        client.close()
+
+async def run_many(n_sessions: int, n_calls: int, concurrency: int, tool: str):
+    """Benchmark: n_sessions sessions each issuing n_calls concurrent calls to `tool`."""
+    # Caps how many sessions are connected at once, so the client's own
+    # connection limits don't become the bottleneck being measured
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one_session(i: int) -> int:
+        async with semaphore:
+            async with MCPProbe() as probe:
+                results = await asyncio.gather(
+                    *(probe.call(tool) for _ in range(n_calls)),
+                    return_exceptions=True
+                )
+                return sum(1 for r in results if not isinstance(r, Exception) and not r.isError)
+    
+    print(f"Benchmarking '{tool}' at {SERVER_URL}: {n_sessions} sessions x {n_calls} calls "
+          f"(at most {concurrency} sessions at once)...")
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(one_session(i) for i in range(n_sessions)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    
+    succeeded = sum(o for o in outcomes if not isinstance(o, BaseException))
+    failed_sessions = [o for o in outcomes if isinstance(o, BaseException)]
+    total = n_sessions * n_calls
+    print(f"✅ {succeeded}/{total} calls succeeded in {elapsed:.2f}s ({succeeded / elapsed:.1f} calls/s)")
+    if failed_sessions:
+        print(f"❌ {len(failed_sessions)} sessions failed, first error: {failed_sessions[0]!r}")
 
 if __name__ == "__main__":
-    asyncio.run(test_mcp_server())
+    parser = argparse.ArgumentParser(description="Test the MCP server, or benchmark it with --sessions.")
+    parser.add_argument("--sync", action="store_true",
+                        help="run the functional test with blocking requests instead of asyncio")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="run the throughput benchmark with this many sessions")
+    parser.add_argument("--calls", type=int, default=10, help="tool calls per benchmark session")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="maximum benchmark sessions connected at once")
+    parser.add_argument("--tool", default="list_watchers_tool",
+                        help="argument-less tool called by the benchmark")
+    args = parser.parse_args()
+    
+    # Same event loop as the server, when available
+    if sys.platform != "win32":
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
+    
+    if args.sessions > 0:
+        asyncio.run(run_many(args.sessions, args.calls, args.concurrency, args.tool))
+    elif args.sync:
+        run_sync_smoke_test()
+    else:
+        asyncio.run(test_mcp_server())
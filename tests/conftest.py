@@ -0,0 +1,24 @@
+import httpx
+import pytest
+
+from app.core import http_client
+
+
+@pytest.fixture
+async def mock_http(monkeypatch):
+    """Route the shared HTTP client through an httpx.MockTransport.
+
+    Call the returned function with a request handler to install a client
+    whose requests are answered by that handler.
+    """
+    clients = []
+
+    def install(handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        clients.append(client)
+        monkeypatch.setattr(http_client, "_client", client)
+        return client
+
+    yield install
+    for client in clients:
+        await client.aclose()
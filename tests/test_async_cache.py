@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from app.core import async_cache
+from app.core.async_cache import AsyncTTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(async_cache, "time", clock)
+    return clock
+
+
+def _counting_fetch(value="value"):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return value
+
+    return fetch, calls
+
+
+async def test_hit_within_ttl_and_refetch_after_expiry(clock):
+    cache = AsyncTTLCache(ttl=10)
+    fetch, calls = _counting_fetch()
+
+    assert await cache.get_or_fetch("k", fetch) == "value"
+    clock.now += 9.9
+    assert await cache.get_or_fetch("k", fetch) == "value"
+    assert len(calls) == 1
+
+    clock.now += 0.2
+    assert await cache.get_or_fetch("k", fetch) == "value"
+    assert len(calls) == 2
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 2
+
+
+async def test_lru_eviction_beyond_maxsize(clock):
+    cache = AsyncTTLCache(ttl=10, maxsize=2)
+    fetch, calls = _counting_fetch()
+
+    for key in ("a", "b", "a", "c"):
+        await cache.get_or_fetch(key, fetch)
+    assert len(calls) == 3  # "a" was a hit and became most recent
+    await cache.get_or_fetch("a", fetch)
+    assert len(calls) == 3
+    await cache.get_or_fetch("b", fetch)
+    assert len(calls) == 4
+
+
+async def test_concurrent_calls_share_one_fetch():
+    cache = AsyncTTLCache(ttl=60)
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "value"
+
+    tasks = [asyncio.create_task(cache.get_or_fetch("k", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == ["value"] * 5
+    assert calls == 1
+
+
+async def test_errors_reach_waiters_and_are_not_cached():
+    cache = AsyncTTLCache(ttl=60)
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        raise RuntimeError("upstream down")
+
+    tasks = [asyncio.create_task(cache.get_or_fetch("k", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert calls == 1
+    with pytest.raises(RuntimeError):
+        await cache.get_or_fetch("k", fetch)
+    assert calls == 2
+
+
+async def test_cache_if_rejects_error_results():
+    cache = AsyncTTLCache(ttl=60, cache_if=lambda result: "error" not in result)
+    fetch, calls = _counting_fetch({"error": "quota"})
+
+    await cache.get_or_fetch("k", fetch)
+    await cache.get_or_fetch("k", fetch)
+    assert len(calls) == 2
+
+
+async def test_cancelled_leader_hands_fetch_to_waiter():
+    cache = AsyncTTLCache(ttl=60)
+    started = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            started.set()
+            await asyncio.sleep(3600)
+        return "value"
+
+    leader = asyncio.create_task(cache.get_or_fetch("k", fetch))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_fetch("k", fetch))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    assert await waiter == "value"
+    assert await cache.get_or_fetch("k", fetch) == "value"
+    assert calls == 2
+
+
+async def test_cancelled_waiter_leaves_leader_running():
+    cache = AsyncTTLCache(ttl=60)
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "value"
+
+    leader = asyncio.create_task(cache.get_or_fetch("k", fetch))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get_or_fetch("k", fetch))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    release.set()
+    assert await leader == "value"
@@ -0,0 +1,101 @@
+import asyncio
+
+from app.config.config import settings
+from app.core import concurrency
+from app.core.concurrency import ConcurrencyLimiter, RateLimiter
+
+
+async def _hold(limiter, order, i, release):
+    async with limiter:
+        order.append(i)
+        await release.wait()
+
+
+async def test_limiter_caps_concurrent_holders():
+    limiter = ConcurrencyLimiter(2)
+    release = asyncio.Event()
+    order = []
+    tasks = [asyncio.create_task(_hold(limiter, order, i, release)) for i in range(5)]
+    await asyncio.sleep(0.01)
+
+    assert limiter.active == 2
+    release.set()
+    await asyncio.gather(*tasks)
+    assert limiter.active == 0
+    assert sorted(order) == list(range(5))
+
+
+async def test_limiter_admits_waiters_in_arrival_order():
+    limiter = ConcurrencyLimiter(1)
+    release = asyncio.Event()
+    order = []
+    tasks = []
+    for i in range(4):
+        tasks.append(asyncio.create_task(_hold(limiter, order, i, release)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert order == [0, 1, 2, 3]
+
+
+async def test_raising_the_limit_admits_waiters():
+    limiter = ConcurrencyLimiter(1)
+    release = asyncio.Event()
+    order = []
+    tasks = [asyncio.create_task(_hold(limiter, order, i, release)) for i in range(3)]
+    await asyncio.sleep(0.01)
+    assert limiter.active == 1
+
+    await limiter.set_limit(3)
+    await asyncio.sleep(0.01)
+    assert limiter.active == 3
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+async def test_reload_limits_resizes_from_settings(monkeypatch):
+    monkeypatch.setattr(concurrency, "_resizable", [])
+    limiter = concurrency.resizable_limiter("MCP_MAX_CONCURRENCY")
+    try:
+        with monkeypatch.context() as m:
+            m.setenv("MCP_MAX_CONCURRENCY", "3")
+            await concurrency.reload_limits()
+            assert limiter.limit == 3
+    finally:
+        settings.reload("MCP_MAX_CONCURRENCY")  # Drop the value read from the patched env
+
+
+async def test_rate_limiter_spaces_acquisitions():
+    loop = asyncio.get_running_loop()
+    limiter = RateLimiter(50)  # One slot every 20 ms
+    start = loop.time()
+
+    times = []
+    for _ in range(4):
+        await limiter.acquire()
+        times.append(loop.time() - start)
+
+    assert times[0] < 0.01
+    assert all(b - a >= 0.02 - 0.005 for a, b in zip(times, times[1:]))
+
+
+async def test_rate_limiter_reserves_slots_in_call_order():
+    limiter = RateLimiter(50)
+    order = []
+
+    async def acquire(i):
+        await limiter.acquire()
+        order.append(i)
+
+    await asyncio.gather(*(acquire(i) for i in range(4)))
+    assert order == [0, 1, 2, 3]
+
+
+async def test_rate_limiter_disabled_for_non_positive_rate():
+    loop = asyncio.get_running_loop()
+    limiter = RateLimiter(0)
+    start = loop.time()
+    for _ in range(100):
+        await limiter.acquire()
+    assert loop.time() - start < 0.01
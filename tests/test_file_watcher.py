@@ -0,0 +1,108 @@
+import asyncio
+import fnmatch
+import os
+
+import pytest
+
+from app.tools.file_watcher import (
+    AsyncFileEventHandler, FileWatcherEvent, _compile_patterns, _watch_targets
+)
+
+_NAMES = ["notes.txt", "NOTES.TXT", "script.py", "script.pyc", "data.tmp",
+          "archive.tar.gz", "readme", ".hidden", "a[1].log", "dir/file.txt"]
+
+
+@pytest.mark.parametrize("patterns", [
+    ["*"],
+    ["*.txt"],
+    ["*.py", "*.txt"],
+    ["*.py?"],
+    ["*.tar.*"],
+    ["readme"],
+    [".*"],
+    ["a[[]1].log"],
+    ["[!.]*"],
+    ["dir/*"],
+])
+def test_compiled_patterns_match_like_fnmatch(patterns):
+    regex = _compile_patterns(patterns)
+    for name in _NAMES:
+        expected = any(fnmatch.fnmatch(name, p) for p in patterns)
+        assert (regex.match(os.path.normcase(name)) is not None) == expected, name
+
+
+def test_no_patterns_compile_to_none():
+    assert _compile_patterns([]) is None
+    assert _compile_patterns(None) is None
+
+
+async def test_modified_burst_delivers_last_event_after_window():
+    delivered = []
+    handler = AsyncFileEventHandler(delivered.append, {"debounce_ms": 20})
+    handler.loop = asyncio.get_running_loop()
+
+    burst = [FileWatcherEvent("modified", "/watched/file.txt") for _ in range(3)]
+    for event in burst:
+        handler._dispatch(event)
+    assert delivered == []
+
+    await asyncio.sleep(0.05)
+    assert delivered == [burst[-1]]
+
+
+async def test_pending_modified_is_delivered_before_later_events():
+    delivered = []
+    handler = AsyncFileEventHandler(delivered.append, {"debounce_ms": 20})
+    handler.loop = asyncio.get_running_loop()
+
+    handler._dispatch(FileWatcherEvent("modified", "/watched/file.txt"))
+    handler._dispatch(FileWatcherEvent("deleted", "/watched/file.txt"))
+    assert [e.event_type for e in delivered] == ["modified", "deleted"]
+
+    await asyncio.sleep(0.05)
+    assert len(delivered) == 2
+
+
+async def test_debounce_disabled_delivers_every_event():
+    delivered = []
+    handler = AsyncFileEventHandler(delivered.append, {"debounce_ms": 0})
+    handler.loop = asyncio.get_running_loop()
+
+    for _ in range(3):
+        handler._dispatch(FileWatcherEvent("modified", "/watched/file.txt"))
+    assert len(delivered) == 3
+
+
+def test_watch_targets_without_specific_files(tmp_path):
+    root = str(tmp_path)
+    assert _watch_targets(root, set(), recursive=True) == [(root, True)]
+    assert _watch_targets(root, set(), recursive=False) == [(root, False)]
+
+
+def test_watch_targets_watch_parents_of_specific_files(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    root = str(tmp_path)
+    files = {os.path.join(root, "a", "one.txt"), os.path.join(root, "a", "two.txt"),
+             os.path.join(root, "b", "three.txt"), os.path.join(root, "top.txt")}
+
+    assert _watch_targets(root, files, recursive=True) == sorted(
+        [(root, False), (os.path.join(root, "a"), False), (os.path.join(root, "b"), False)])
+    assert _watch_targets(root, files, recursive=False) == [(root, False)]
+
+
+def test_watch_targets_under_filesystem_root(tmp_path):
+    root = os.path.abspath(os.sep)
+    (tmp_path / "a").mkdir()
+    target = os.path.join(str(tmp_path), "a", "one.txt")
+
+    assert _watch_targets(root, {target}, recursive=True) == [(os.path.join(str(tmp_path), "a"), False)]
+
+
+def test_watch_targets_fall_back_to_root(tmp_path):
+    root = str(tmp_path)
+    outside = {os.path.join(os.path.dirname(root), "elsewhere.txt")}
+    missing = {os.path.join(root, "missing", "file.txt")}
+
+    assert _watch_targets(root, outside, recursive=True) == [(root, True)]
+    assert _watch_targets(root, missing, recursive=True) == [(root, True)]
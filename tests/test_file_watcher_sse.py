@@ -0,0 +1,17 @@
+from app.tools import file_watcher_sse
+from app.tools.file_watcher_sse import SSEFileWatcherNotifier
+
+
+def test_full_channel_drops_oldest_frames(monkeypatch):
+    monkeypatch.setattr(file_watcher_sse, "_CLIENT_QUEUE_SIZE", 3)
+    notifier = SSEFileWatcherNotifier()
+    channel = file_watcher_sse._ClientChannel()
+
+    for i in range(5):
+        notifier._enqueue("client", channel, b"frame %d" % i)
+
+    assert channel.ready.is_set()
+    assert notifier.dropped_events == 2
+    assert channel.take_all() == [b"frame 2", b"frame 3", b"frame 4"]
+    assert not channel.ready.is_set()
+    assert channel.take_all() == []
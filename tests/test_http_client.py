@@ -0,0 +1,111 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import http_client
+from app.core.concurrency import ConcurrencyLimiter, RateLimiter
+from app.core.http_client import get_with_retries
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(http_client.random, "uniform", lambda a, b: 0.0)
+
+
+def _response(status, headers=None):
+    return httpx.Response(status, headers=headers)
+
+
+@pytest.mark.parametrize("retry_after, expected", [
+    ("2", 2.0),
+    ("0", 0.0),
+    ("-5", 0.0),
+    ("3600", http_client._MAX_RETRY_DELAY),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", 1.0),  # HTTP-date falls back to backoff
+    (None, 1.0),
+])
+def test_retry_delay_clamps_retry_after(retry_after, expected):
+    headers = {"Retry-After": retry_after} if retry_after is not None else None
+    assert http_client._retry_delay(_response(503, headers), attempt=1) == expected
+
+
+def test_retry_delay_backoff_is_capped():
+    assert http_client._retry_delay(_response(503), attempt=10) == http_client._MAX_RETRY_DELAY
+
+
+async def test_retries_until_success(mock_http):
+    statuses = iter([503, 429, 200])
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(next(statuses), headers={"Retry-After": "0"})
+
+    mock_http(handler)
+    response = await get_with_retries("https://upstream.test/api")
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+async def test_gives_up_after_max_retries(mock_http):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503, headers={"Retry-After": "0"})
+
+    mock_http(handler)
+    response = await get_with_retries("https://upstream.test/api")
+    assert response.status_code == 503
+    assert len(calls) == http_client._MAX_RETRIES + 1
+
+
+async def test_does_not_retry_client_errors(mock_http):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(404)
+
+    mock_http(handler)
+    response = await get_with_retries("https://upstream.test/api")
+    assert response.status_code == 404
+    assert len(calls) == 1
+
+
+class _CountingRate(RateLimiter):
+    def __init__(self):
+        super().__init__(0)
+        self.acquired = 0
+
+    async def acquire(self):
+        self.acquired += 1
+        await super().acquire()
+
+
+async def test_each_attempt_is_admitted_separately(mock_http):
+    limiter = ConcurrencyLimiter(1)
+    rate = _CountingRate()
+    seen = []
+
+    def handler(request):
+        name = request.url.params["caller"]
+        seen.append(name)
+        assert limiter.active == 1
+        if name == "throttled" and seen.count(name) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.1"})
+        return httpx.Response(200)
+
+    mock_http(handler)
+    throttled = asyncio.create_task(get_with_retries(
+        "https://upstream.test/api", limiter=limiter, rate=rate, params={"caller": "throttled"}))
+    await asyncio.sleep(0.02)  # throttled is now waiting to retry
+    other = await get_with_retries(
+        "https://upstream.test/api", limiter=limiter, rate=rate, params={"caller": "other"})
+
+    assert other.status_code == 200
+    assert (await throttled).status_code == 200
+    assert seen == ["throttled", "other", "throttled"]
+    assert rate.acquired == 3
+    assert limiter.active == 0
@@ -0,0 +1,115 @@
+import asyncio
+
+import httpx
+import orjson
+import pytest
+
+from app.core import concurrency
+from app.core.concurrency import ConcurrencyLimiter, outbound_limiter
+from app.tools import web_search
+from app.tools.web_search import search_brave
+
+_BRAVE_BODY = orjson.dumps({"web": {"results": [
+    {"title": "Result", "url": "https://example.com", "description": "An example"},
+]}})
+
+
+@pytest.fixture(autouse=True)
+def brave_configured(monkeypatch):
+    monkeypatch.setattr(web_search.settings, "BRAVE_API_KEY", "test-key", raising=False)
+    monkeypatch.setattr(web_search, "_brave_rate", concurrency.RateLimiter(0))
+    search_brave.cache.clear()
+    web_search._validators.clear()
+    yield
+    search_brave.cache.clear()
+    web_search._validators.clear()
+
+
+async def test_cache_hits_do_not_wait_for_outbound_slots(mock_http):
+    mock_http(lambda request: httpx.Response(200, content=_BRAVE_BODY))
+    await search_brave("example")
+
+    limit = outbound_limiter.limit
+    await outbound_limiter.set_limit(1)
+    try:
+        async with outbound_limiter:  # Every outbound slot is taken
+            result = await asyncio.wait_for(search_brave("example"), timeout=1)
+    finally:
+        await outbound_limiter.set_limit(limit)
+    assert "error" not in result
+
+
+async def test_per_engine_limit_caps_concurrent_requests(mock_http, monkeypatch):
+    monkeypatch.setattr(web_search, "_brave_limiter", ConcurrencyLimiter(2))
+    active = peak = 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(200, content=_BRAVE_BODY)
+
+    mock_http(handler)
+    results = await asyncio.gather(*(search_brave(f"query {i}") for i in range(6)))
+
+    assert all("error" not in r for r in results)
+    assert peak == 2
+
+
+async def test_expired_result_is_revalidated_with_etag(mock_http):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, content=_BRAVE_BODY, headers={"ETag": '"v1"'})
+
+    mock_http(handler)
+    first = await search_brave("example")
+    search_brave.cache.clear()  # As if the TTL had expired
+    second = await search_brave("example")
+
+    assert seen == [None, '"v1"']
+    assert second == first
+    assert first["results"][0]["url"] == "https://example.com"
+
+
+async def test_no_validator_without_etag(mock_http):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        return httpx.Response(200, content=_BRAVE_BODY)
+
+    mock_http(handler)
+    await search_brave("example")
+    search_brave.cache.clear()
+    await search_brave("example")
+
+    assert seen == [None, None]
+
+
+async def test_repeat_queries_are_served_from_cache(mock_http):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, content=_BRAVE_BODY)
+
+    mock_http(handler)
+    first = await search_brave("example", sites=["b.com", "a.com"])
+    second = await search_brave("example", sites=["a.com", "b.com"])
+
+    assert second == first
+    assert len(calls) == 1
+
+
+async def test_upstream_errors_are_not_cached(mock_http):
+    statuses = iter([400, 200])
+    mock_http(lambda request: httpx.Response(next(statuses), content=_BRAVE_BODY))
+
+    assert "error" in await search_brave("example")
+    assert "error" not in await search_brave("example")